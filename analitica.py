@@ -0,0 +1,233 @@
+"""Capa de análisis del dashboard, sin dependencias de Streamlit.
+
+`AlmacenViajes` reúne el índice de filas y el cubo de agregación; `filtrar`
+devuelve una `ConsultaViajes` con los agregados de cada gráfico y sus
+insights. La aplicación, la exportación y los benchmarks usan la misma API.
+"""
+import datetime
+import json
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+import pandas as pd
+
+from cache import CacheLRU
+from cubo import construir_cubo
+from datos import MESES, RUTA_DATOS, cargar_viajes
+from estacionalidad import conteo_dia_semana, conteo_diario, conteo_mensual, conteo_semanal
+from filtros import COLUMNAS_FILTRO, IndiceFiltros
+from graficos import estadisticas_caja
+from incremental import AgregadosIncrementales
+from particiones import DIRECTORIO_PARTICIONES, DatasetParticionado
+
+Rango = Optional[Tuple[datetime.date, datetime.date]]
+Selecciones = Mapping[str, Sequence[str]]
+
+# Resoluciones del gráfico estacional: nombre del periodo y título del eje
+RESOLUCIONES: Dict[str, Tuple[str, str]] = {
+    "Mensual": ('mes', 'Mes'),
+    "Semanal": ('semana', 'Semana (inicio)'),
+    "Diaria": ('día', 'Día'),
+    "Día de la semana": ('día de la semana', 'Día de la semana'),
+}
+
+
+def leer_presets(ruta: str) -> List[dict]:
+    """Filtros predefinidos de un fichero JSON: una lista de objetos con `nombre`, las columnas
+    de filtro que se quieran fijar y, opcionalmente, `fecha_inicio` y `fecha_fin`."""
+    with open(ruta, encoding='utf-8') as f:
+        presets = json.load(f)
+    if not isinstance(presets, list) or not all(isinstance(preset, dict) for preset in presets):
+        raise ValueError(f"{ruta} debe contener una lista de objetos")
+    for i, preset in enumerate(presets):
+        preset.setdefault('nombre', f'preset_{i + 1}')
+    return presets
+
+
+def extremos(serie: pd.Series) -> Tuple[Tuple[str, float], Tuple[str, float]]:
+    """Etiqueta y valor del máximo y del mínimo de una serie (el primero en caso de empate)."""
+    alto, bajo = serie.idxmax(), serie.idxmin()
+    return (alto, serie[alto].item()), (bajo, serie[bajo].item())
+
+
+class AlmacenViajes:
+    """Viajes cargados con su índice de filtros por filas y su cubo de agregación."""
+
+    def __init__(self, indice_filas: IndiceFiltros, indice_cubo: IndiceFiltros,
+                 cubos_rango: Optional[CacheLRU] = None):
+        self.indice_filas = indice_filas
+        self.indice_cubo = indice_cubo
+        # El cubo completo no tiene días: los de cada rango de fechas se construyen bajo demanda
+        self.cubos_rango = cubos_rango if cubos_rango is not None else CacheLRU(max_entradas=8)
+
+    @classmethod
+    def desde_archivo(cls, ruta: str = RUTA_DATOS) -> 'AlmacenViajes':
+        df = cargar_viajes(ruta)
+        return cls.desde_dataframe(df)
+
+    @classmethod
+    def desde_particiones(cls, directorio: str = DIRECTORIO_PARTICIONES, paises: Optional[Sequence[str]] = None,
+                          rango: Optional[Tuple[Optional[datetime.date], Optional[datetime.date]]] = None,
+                          procesos: Optional[int] = None) -> 'AlmacenViajes':
+        """Almacén con solo las particiones de `directorio` que pueden cumplir `paises` y `rango`."""
+        return cls.desde_dataframe(DatasetParticionado(directorio, procesos).cargar(paises, rango))
+
+    @classmethod
+    def desde_dataframe(cls, df: pd.DataFrame) -> 'AlmacenViajes':
+        return cls(IndiceFiltros(df, columna_fecha='fecha'), IndiceFiltros(construir_cubo(df)))
+
+    @property
+    def df(self) -> pd.DataFrame:
+        return self.indice_filas.df
+
+    @property
+    def fecha_minima(self) -> datetime.date:
+        return pd.Timestamp(self.indice_filas.fechas[0]).date()
+
+    @property
+    def fecha_maxima(self) -> datetime.date:
+        return pd.Timestamp(self.indice_filas.fechas[-1]).date()
+
+    def valores(self, columna: str) -> List[str]:
+        """Valores posibles de una columna de filtro.
+
+        Salen del cubo, que cubre todos los viajes: con la ingesta por bloques
+        las filas son solo una muestra y pueden faltar valores poco frecuentes.
+        """
+        return list(self.indice_cubo.posiciones[columna])
+
+    def cubo(self, rango: Rango = None) -> IndiceFiltros:
+        """Índice del cubo de todos los viajes o de los de un rango de fechas."""
+        if rango is None:
+            return self.indice_cubo
+        return self.cubos_rango.get_or_set(
+            rango, lambda: IndiceFiltros(construir_cubo(self.indice_filas.filtrar({}, rango)))
+        )
+
+    def filtrar(self, selecciones: Optional[Selecciones] = None, rango: Rango = None,
+                agregados: Optional[AgregadosIncrementales] = None) -> 'ConsultaViajes':
+        """Consulta sobre los viajes que cumplen las selecciones y el rango de fechas.
+
+        Las columnas que no aparecen en `selecciones` no filtran. Se pueden pasar
+        unos `agregados` ya construidos sobre `cubo(rango)` para reutilizarlos.
+        """
+        selecciones = dict(selecciones or {})
+        completas = {
+            columna: list(selecciones.get(columna, self.valores(columna))) for columna in COLUMNAS_FILTRO
+        }
+        if agregados is None:
+            agregados = AgregadosIncrementales(self.cubo(rango), completas)
+        return ConsultaViajes(self, completas, rango, agregados)
+
+    def filtrar_preset(self, preset: Mapping) -> 'ConsultaViajes':
+        """Consulta de un filtro predefinido de `leer_presets`."""
+        selecciones = {columna: preset[columna] for columna in COLUMNAS_FILTRO if columna in preset}
+        rango = None
+        if 'fecha_inicio' in preset or 'fecha_fin' in preset:
+            rango = (
+                pd.Timestamp(preset.get('fecha_inicio', self.fecha_minima)).date(),
+                pd.Timestamp(preset.get('fecha_fin', self.fecha_maxima)).date(),
+            )
+            # El rango completo equivale a no filtrar por fecha, como en la aplicación
+            if rango == (self.fecha_minima, self.fecha_maxima):
+                rango = None
+        return self.filtrar(selecciones, rango)
+
+
+class ConsultaViajes:
+    """Resultados de una combinación de filtros; las filas se extraen una sola vez y solo si se piden."""
+
+    def __init__(self, almacen: AlmacenViajes, selecciones: Dict[str, List[str]], rango: Rango,
+                 agregados: AgregadosIncrementales):
+        self.almacen = almacen
+        self.selecciones = selecciones
+        self.rango = rango
+        self.agregados = agregados
+        self._filas: Optional[pd.DataFrame] = None
+
+    def filas(self) -> pd.DataFrame:
+        if self._filas is None:
+            self._filas = self.almacen.indice_filas.filtrar(self.selecciones, self.rango)
+        return self._filas
+
+    def total_viajes(self) -> int:
+        return self.agregados.total_viajes()
+
+    def estacionalidad(self, resolucion: str = "Mensual") -> pd.Series:
+        """Viajes por periodo según una de las `RESOLUCIONES`."""
+        inicio, fin = self.rango or (self.almacen.fecha_minima, self.almacen.fecha_maxima)
+        if resolucion == "Mensual":
+            # Meses del cubo en 12 posiciones fijas, ya en orden cronológico
+            conteo_meses = self.agregados.conteo_por('mes')
+            conteos = conteo_mensual(conteo_meses.index.to_numpy(), conteo_meses.to_numpy())
+            meses = pd.period_range(inicio, fin, freq='M').month
+            if self.rango is None or len(meses) >= 12:
+                return conteos
+            # Con un rango de fechas solo los meses que toca, en el orden del rango
+            return conteos.iloc[list(dict.fromkeys(meses - 1))]
+        # Semanas y días salen de las fechas de las filas del rango
+        fechas = self.filas()['fecha'].to_numpy()
+        if resolucion == "Semanal":
+            return conteo_semanal(fechas, inicio, fin)
+        if resolucion == "Diaria":
+            return conteo_diario(fechas, inicio, fin)
+        if resolucion == "Día de la semana":
+            return conteo_dia_semana(fechas)
+        raise ValueError(f"Resolución desconocida: {resolucion}")
+
+    def temporadas(self, resolucion: str = "Mensual") -> Tuple[Tuple[str, float], Tuple[str, float]]:
+        """Periodos con más y con menos viajes según `extremos`.
+
+        Los meses o semanas de los bordes que el rango de fechas solo cubre en
+        parte no cuentan, salvo que no quede ningún periodo completo.
+        """
+        conteos = self.estacionalidad(resolucion)
+        inicio, fin = self.rango or (self.almacen.fecha_minima, self.almacen.fecha_maxima)
+        inicio, fin = pd.Timestamp(inicio), pd.Timestamp(fin)
+        if resolucion == "Semanal":
+            primero_completo, ultimo_completo = inicio.dayofweek == 0, fin.dayofweek == 6
+        elif resolucion == "Mensual" and self.rango is not None and len(conteos) < 12:
+            primero_completo, ultimo_completo = inicio.day == 1, fin.is_month_end
+        else:
+            primero_completo = ultimo_completo = True
+        completos = conteos.iloc[(0 if primero_completo else 1):len(conteos) - (0 if ultimo_completo else 1)]
+        return extremos(completos if len(completos) else conteos)
+
+    def top_ciudades(self, n: int = 10) -> pd.Series:
+        return self.agregados.top_conteo('ciudad', n)
+
+    def concentracion(self, n: int = 3) -> float:
+        """Porcentaje de los viajes que suman las `n` ciudades más visitadas."""
+        return round(self.top_ciudades(n).sum() / self.total_viajes() * 100, 1)
+
+    def gasto_por_alojamiento(self) -> pd.Series:
+        return self.agregados.media_por('tipo_alojamiento', 'gasto_diario')
+
+    def valoracion_por_pais(self) -> pd.Series:
+        return self.agregados.media_por('pais', 'valoracion')
+
+    def duracion_por_ciudad(self, n: int = 10) -> pd.Series:
+        return self.agregados.top_media('ciudad', 'duracion_estancia', n)
+
+    def conteo_transporte(self) -> pd.Series:
+        """Viajes por medio de transporte, de mayor a menor."""
+        return self.agregados.conteo_por('transporte')
+
+    def reparto_transporte_mensual(self) -> pd.DataFrame:
+        """Porcentaje de los viajes de cada mes (filas) hecho en cada medio de transporte (columnas)."""
+        conteos = self.agregados.conteo_cruzado('mes', 'transporte')
+        conteos = conteos.loc[conteos.sum(axis=1) > 0, conteos.sum(axis=0) > 0]
+        reparto = conteos.div(conteos.sum(axis=1), axis=0) * 100
+        reparto.index = pd.Index([MESES[mes - 1] for mes in reparto.index], name='Mes')
+        return reparto
+
+    def gasto_por_transporte(self) -> pd.Series:
+        return self.agregados.media_por('transporte', 'gasto_diario')
+
+    def valoracion_por_transporte(self) -> pd.Series:
+        return self.agregados.media_por('transporte', 'valoracion')
+
+    def media_global(self, medida: str) -> float:
+        return float(self.agregados.media_global(medida))
+
+    def estadisticas_caja(self, grupo: str, valor: str) -> List[dict]:
+        return estadisticas_caja(self.filas(), grupo, valor)
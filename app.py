@@ -1,19 +1,49 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
 import streamlit as st
-import pandas as pd
-import numpy as np
-import plotly.express as px
-import plotly.graph_objects as go
-from datetime import datetime
-import folium
-from streamlit_folium import folium_static
-import calendar
-
-# Constantes para evitar duplicados (corrige errores de lint)
-COL_NUM_VIAJES = 'Número de viajes'
-COL_DURACION_DIAS = 'Duración promedio (días)'
+import plotly.io as pio
+import streamlit.components.v1 as components
 
 # Importar módulos personalizados
 from caso_estudio import mostrar_caso_estudio
+from mapa import (
+    ANCHO_MAPA, ALTO_MAPA, agregar_por_ciudad, crear_mapa_clusters, crear_mapa_plotly,
+    crear_mapa_viajes, construir_popups, renderizar_html, usar_mapa_webgl
+)
+from cache import MAX_MB_CACHE_DISCO, RUTA_CACHE_DISCO, CacheDisco, CacheLRU, clave_filtros
+from filtros import IndiceFiltros
+from datos import RUTA_DATOS, cargar_viajes, version_datos
+from graficos import COL_DURACION_DIAS, COL_NUM_VIAJES
+from clusters import ZOOM_MAXIMO, ZOOM_MINIMO, ClustersPorZoom, dispersar
+from perfilado import HistorialEtapas, Perfilador
+from ingesta import leer_por_bloques, usar_streaming
+from particiones import DIRECTORIO_PARTICIONES, DatasetParticionado, descubrir_particiones, version_particiones
+from cubo import construir_cubo
+from incremental import AgregadosIncrementales
+from analitica import RESOLUCIONES, AlmacenViajes, extremos, leer_presets
+from figuras import FIGURAS, mapa_ciudades
+
+logger = logging.getLogger(__name__)
+
+# Streamlit no configura el logger raíz (queda en WARNING y sin manejador): los módulos
+# del proyecto que informan en INFO reciben su propio manejador
+NIVEL_LOG = os.environ.get("TURISMO_NIVEL_LOG", "INFO")
+
+def configurar_log(*nombres):
+    for nombre in nombres:
+        registro = logging.getLogger(nombre)
+        # El script se vuelve a ejecutar en cada interacción: el manejador se añade una sola vez
+        if not registro.handlers:
+            manejador = logging.StreamHandler()
+            manejador.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+            registro.addHandler(manejador)
+            registro.propagate = False
+        registro.setLevel(NIVEL_LOG)
+
+configurar_log("datos", "perfilado")
 
 # Configuración de la página
 st.set_page_config(
@@ -27,9 +57,9 @@ st.set_page_config(
 st.markdown("""
 <style>
     .main {background-color: #f8f9fa;}
-    .stTabs [data-baseweb="tab-list"] {gap: 24px;}
-    .stTabs [data-baseweb="tab"] {background-color: #e6f2ff; border-radius: 4px; padding: 10px 20px;}
-    .stTabs [aria-selected="true"] {background-color: #4a86e8; color: white;}
+    .st-key-seccion div[role="radiogroup"] {gap: 24px;}
+    .st-key-seccion div[role="radiogroup"] > label {background-color: #e6f2ff; border-radius: 4px; padding: 10px 20px;}
+    .st-key-seccion div[role="radiogroup"] > label:has(input:checked) {background-color: #4a86e8; color: white;}
     h1 {color: #1a365d; font-weight: 800; margin-bottom: 0.5em;}
     h2 {color: #2a4365; font-weight: 700;}
     h3 {color: #2c5282; font-weight: 600;}
@@ -60,17 +90,225 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# Si hay extractos por mes y país (viajes_AAAA-MM_<pais>.csv) se usan en lugar del CSV único
+RUTAS_PARTICIONES = descubrir_particiones(DIRECTORIO_PARTICIONES)
+
+# Con exportaciones muy grandes los datos se leen por bloques: cubo completo y muestra acotada
+STREAMING = usar_streaming(RUTAS_PARTICIONES or RUTA_DATOS)
+
+@st.cache_resource
+def cargar_ingesta():
+    return leer_por_bloques(RUTAS_PARTICIONES or RUTA_DATOS)
+
+# Particiones con su manifiesto de fechas y países; las nuevas se leen en paralelo en otro proceso
+@st.cache_resource
+def cargar_dataset():
+    return DatasetParticionado(DIRECTORIO_PARTICIONES, subproceso=True)
+
 # Función para cargar los datos
 @st.cache_data
 def load_data():
-    df = pd.read_csv("data/DOC03_Datos_U2_IDSD_VIS_TOM_DEC_542_CE.csv")
-    df['fecha'] = pd.to_datetime(df['fecha'])
-    df['mes'] = df['fecha'].dt.month
-    df['mes_nombre'] = df['fecha'].dt.month_name()
-    return df
+    if STREAMING:
+        return cargar_ingesta().muestra
+    if RUTAS_PARTICIONES:
+        return cargar_dataset().cargar()
+    return cargar_viajes(RUTA_DATOS)
+
+# Cache del HTML de los mapas compartida por todas las sesiones del proceso
+@st.cache_resource
+def obtener_cache_mapas():
+    return CacheLRU(max_entradas=32, max_bytes=64 * 1024 * 1024)
+
+# Clusters por nivel de zoom de cada combinación de filtros
+@st.cache_resource
+def obtener_cache_clusters():
+    return CacheLRU(max_entradas=16)
+
+# Índice de filtros construido una sola vez por proceso sobre los datos cargados
+@st.cache_resource
+def cargar_indice_filtros():
+    df = load_data().copy()
+    # El HTML de los popups se genera una vez; en cada ejecución solo se aplica el filtro
+    df['popup'] = construir_popups(df)
+    # Ordenado por fecha para resolver los rangos de fechas con búsqueda binaria
+    return IndiceFiltros(df, columna_fecha='fecha')
+
+# Cubo de agregación precalculado, indexado con las mismas columnas de filtro
+@st.cache_resource
+def cargar_cubo():
+    if STREAMING:
+        return IndiceFiltros(cargar_ingesta().cubo)
+    return IndiceFiltros(construir_cubo(load_data()))
+
+# Capa de análisis compartida por todas las sesiones; guarda también los cubos de los rangos recientes
+@st.cache_resource
+def cargar_almacen():
+    return AlmacenViajes(cargar_indice_filtros(), cargar_cubo(), cubos_rango=CacheLRU(max_entradas=8))
+
+# Perfilado opcional de cada etapa (?perfil=1 o TURISMO_PERFIL=1)
+@st.cache_resource
+def obtener_historial_perfil():
+    return HistorialEtapas()
+
+PERFIL_ACTIVO = os.environ.get("TURISMO_PERFIL") == "1" or st.query_params.get("perfil") == "1"
+# La memoria por etapa activa tracemalloc en todo el proceso: solo con TURISMO_PERFIL_MEMORIA=1
+PERFIL_MEMORIA = os.environ.get("TURISMO_PERFIL_MEMORIA") == "1"
+perfil = Perfilador(PERFIL_ACTIVO, obtener_historial_perfil(), medir_memoria=PERFIL_MEMORIA)
+
+# Se incrementa cuando cambia el código de las figuras o de los mapas guardados en la cache de disco
+VERSION_DERIVADOS = 1
+
+# Artefactos derivados (figuras, HTML, estadísticas) compartidos entre procesos y reinicios
+@st.cache_resource
+def obtener_cache_disco():
+    return CacheDisco(RUTA_CACHE_DISCO, max_bytes=int(MAX_MB_CACHE_DISCO * 1024 * 1024))
+
+@st.cache_resource
+def obtener_version_datos():
+    if RUTAS_PARTICIONES:
+        return version_particiones(RUTAS_PARTICIONES)
+    return version_datos(RUTA_DATOS)
+
+def clave_seleccion(selecciones, rango_fechas):
+    rango = None if rango_fechas is None else tuple(str(fecha) for fecha in rango_fechas)
+    return clave_filtros(*selecciones.values()) + (rango,)
+
+def clave_derivada(consulta, *partes):
+    # Con la ingesta por bloques las cajas y el mapa salen de la muestra: no comparten entradas con la carga completa
+    return (VERSION_DERIVADOS, STREAMING, obtener_version_datos()) + clave_seleccion(consulta.selecciones, consulta.rango) + partes
+
+def figura_cacheada(clave, construir):
+    json_figura = obtener_cache_disco().get_or_set(clave, lambda: construir().to_json())
+    return pio.from_json(json_figura)
+
+def figura_consulta(nombre, consulta, *argumentos):
+    """Figura `nombre` de `FIGURAS` para la consulta, cacheada en disco junto con sus argumentos."""
+    return figura_cacheada(
+        clave_derivada(consulta, nombre, *argumentos), lambda: FIGURAS[nombre](consulta, *argumentos)
+    )
+
+def html_mapa_cacheado(consulta, construir, *partes):
+    """HTML de un mapa de folium servido desde la cache en memoria y, si no está, desde la de disco."""
+    clave_mapa = clave_seleccion(consulta.selecciones, consulta.rango) + partes
+    return obtener_cache_mapas().get_or_set(
+        clave_mapa,
+        lambda: obtener_cache_disco().get_or_set(clave_derivada(consulta, 'mapa_html', *partes), construir)
+    )
+
+def html_mapa_guardado(consulta, *partes):
+    """HTML del mapa si ya está en alguna de las caches, sin construirlo; si no, None."""
+    clave_mapa = clave_seleccion(consulta.selecciones, consulta.rango) + partes
+    html_mapa = obtener_cache_mapas().get(clave_mapa)
+    if html_mapa is None:
+        html_mapa = obtener_cache_disco().get(clave_derivada(consulta, 'mapa_html', *partes))
+        if html_mapa is not None:
+            obtener_cache_mapas().set(clave_mapa, html_mapa)
+    return html_mapa
+
+# Los mapas de folium se pueden construir fuera de la ejecución del script, en un grupo de hilos compartido
+INTERVALO_MAPA = 0.5  # segundos entre comprobaciones de si el mapa ya está listo
+
+@st.cache_resource
+def obtener_ejecutor_mapas():
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix="mapas")
+
+@st.cache_resource
+def obtener_mapas_pendientes():
+    return {}, threading.Lock()
+
+def mapa_en_segundo_plano(clave, construir):
+    """Futuro con el HTML del mapa; varias sesiones con la misma clave comparten la construcción."""
+    pendientes, lock = obtener_mapas_pendientes()
+    with lock:
+        futuro = pendientes.get(clave)
+        if futuro is not None:
+            return futuro
+        futuro = pendientes[clave] = obtener_ejecutor_mapas().submit(construir)
+
+    def terminar(_):
+        # Ya en cache (o fallido): la siguiente petición no debe reutilizar este futuro
+        with lock:
+            if pendientes.get(clave) is futuro:
+                del pendientes[clave]
+    # Fuera del lock: si el futuro ya terminó, el callback se ejecuta aquí mismo y toma el lock
+    futuro.add_done_callback(terminar)
+    return futuro
+
+def mostrar_mapa_progresivo(futuro, df_filtrado):
+    """Resumen por ciudad mientras se construye el mapa; al terminar se vuelve a ejecutar la app para mostrarlo."""
+    # El resumen se calcula una vez; el fragmento solo lo vuelve a dibujar en cada comprobación
+    resumen = agregar_por_ciudad(df_filtrado).nlargest(10, 'viajes')
+    resumen = resumen[['ciudad', 'pais', 'viajes', 'duracion_media', 'gasto_medio', 'valoracion_media']].rename(columns={
+        'ciudad': 'Ciudad', 'pais': 'País', 'viajes': 'Viajes', 'duracion_media': 'Duración media (días)',
+        'gasto_medio': 'Gasto diario medio (€)', 'valoracion_media': 'Valoración media',
+    }).round(2)
+
+    @st.fragment(run_every=INTERVALO_MAPA)
+    def esperar_mapa():
+        if futuro.done():
+            if futuro.exception() is not None:
+                st.error(f"No se pudo generar el mapa: {futuro.exception()}")
+                return
+            st.rerun()
+        st.caption("⏳ Generando el mapa… Mientras tanto, el resumen de las ciudades más visitadas:")
+        st.dataframe(
+            resumen,
+            hide_index=True,
+            height=ALTO_MAPA - 100,
+            use_container_width=True
+        )
+    esperar_mapa()
+
+def mostrar_grafico(nombre, fig):
+    with perfil.etapa(nombre):
+        st.plotly_chart(fig, use_container_width=True)
+    perfil.payload(nombre, fig)
+
+# Precalentado en segundo plano de la vista por defecto y de los filtros populares (TURISMO_PRECALENTADO=0 lo desactiva)
+PRECALENTADO = os.environ.get("TURISMO_PRECALENTADO", "1") != "0"
+RUTA_PRESETS = os.environ.get("TURISMO_PRESETS", "presets.json")
+# Argumentos de las figuras al abrir la aplicación: resolución mensual y cajas calculadas en el servidor
+ARGUMENTOS_INICIALES = {'fig_meses': ("Mensual",), 'fig_alojamiento': (True,), 'fig_valoracion': (True,)}
+
+def precalentar(almacen):
+    presets = [{'nombre': 'Vista por defecto'}]
+    if os.path.exists(RUTA_PRESETS):
+        try:
+            presets += leer_presets(RUTA_PRESETS)
+        except (OSError, ValueError):
+            # El precalentado es opcional: con un fichero de presets inválido se precalienta solo la vista por defecto
+            logger.exception("No se pudieron leer los filtros de %s", RUTA_PRESETS)
+    for preset in presets:
+        # La ingesta por bloques no conserva las fechas: los filtros con rango se omiten
+        if STREAMING and ('fecha_inicio' in preset or 'fecha_fin' in preset):
+            continue
+        try:
+            consulta = almacen.filtrar_preset(preset)
+            if consulta.total_viajes() == 0:
+                continue
+            for nombre in FIGURAS:
+                figura_consulta(nombre, consulta, *ARGUMENTOS_INICIALES.get(nombre, ()))
+            html_mapa_cacheado(consulta, lambda: renderizar_html(mapa_ciudades(consulta)), "Por ciudad", None, None)
+        except Exception:
+            # Un filtro mal definido no debe impedir precalentar el resto
+            logger.exception("No se pudo precalentar el filtro %s", preset.get('nombre'))
+
+# Un solo hilo por proceso, lanzado por la primera ejecución del script
+@st.cache_resource
+def iniciar_precalentado():
+    # Los recursos cacheados se crean aquí: desde el hilo solo se leen, sin contexto de ejecución
+    obtener_cache_disco(), obtener_cache_mapas(), obtener_version_datos()
+    hilo = threading.Thread(target=precalentar, args=(cargar_almacen(),), name="precalentado", daemon=True)
+    hilo.start()
+    return hilo
 
 # Cargar los datos
-df = load_data()
+with perfil.etapa("carga_datos"):
+    almacen = cargar_almacen()
+    df = almacen.df
+
+if PRECALENTADO:
+    iniciar_precalentado()
 
 # Título y descripción
 st.title("📊 Análisis de Tendencias Turísticas en Europa 2023")
@@ -94,30 +332,70 @@ col1, col2, col3 = st.columns(3)
 with col1:
     paises_seleccionados = st.multiselect(
         "Seleccionar países",
-        options=df['pais'].unique(),
-        default=df['pais'].unique()
+        options=almacen.valores('pais'),
+        default=almacen.valores('pais')
     )
 
 with col2:
     alojamientos_seleccionados = st.multiselect(
         "Seleccionar tipos de alojamiento",
-        options=df['tipo_alojamiento'].unique(),
-        default=df['tipo_alojamiento'].unique()
+        options=almacen.valores('tipo_alojamiento'),
+        default=almacen.valores('tipo_alojamiento')
     )
 
 with col3:
     motivos_seleccionados = st.multiselect(
         "Seleccionar motivos de viaje",
-        options=df['motivo_viaje'].unique(),
-        default=df['motivo_viaje'].unique()
+        options=almacen.valores('motivo_viaje'),
+        default=almacen.valores('motivo_viaje')
     )
 
-# Filtrar los datos según las selecciones
-df_filtrado = df[
-    df['pais'].isin(paises_seleccionados) &
-    df['tipo_alojamiento'].isin(alojamientos_seleccionados) &
-    df['motivo_viaje'].isin(motivos_seleccionados)
-]
+# Filtro por rango de fechas sobre las filas ordenadas por fecha
+col1, col2, col3 = st.columns(3)
+fecha_minima = almacen.fecha_minima
+fecha_maxima = almacen.fecha_maxima
+rango_fechas = None
+with col1:
+    if STREAMING:
+        st.caption("El filtro de fechas no está disponible con la ingesta por bloques.")
+    else:
+        rango = st.date_input(
+            "Rango de fechas",
+            value=(fecha_minima, fecha_maxima),
+            min_value=fecha_minima,
+            max_value=fecha_maxima,
+            format="DD/MM/YYYY"
+        )
+        # Mientras se elige el rango el widget devuelve una sola fecha
+        if len(rango) == 2 and tuple(rango) != (fecha_minima, fecha_maxima):
+            rango_fechas = tuple(rango)
+
+with col2:
+    transportes_seleccionados = st.multiselect(
+        "Seleccionar medios de transporte",
+        options=almacen.valores('transporte'),
+        default=almacen.valores('transporte')
+    )
+
+# Selecciones de los filtros
+selecciones = {
+    'pais': paises_seleccionados,
+    'tipo_alojamiento': alojamientos_seleccionados,
+    'motivo_viaje': motivos_seleccionados,
+    'transporte': transportes_seleccionados
+}
+
+# Agregados de los gráficos a partir de las celdas del cubo que cumplen el filtro
+with perfil.etapa("agregados"):
+    # Los agregados de la sesión se actualizan solo con la diferencia respecto a la selección anterior
+    indice_cubo_activo = almacen.cubo(rango_fechas)
+    agregados = st.session_state.get("agregados")
+    if agregados is None or agregados.indice is not indice_cubo_activo:
+        agregados = st.session_state["agregados"] = AgregadosIncrementales(indice_cubo_activo, selecciones)
+    else:
+        agregados.actualizar(selecciones)
+    consulta = almacen.filtrar(selecciones, rango_fechas, agregados)
+    num_viajes = consulta.total_viajes()
 
 # Mostrar número de viajes después de filtrar con un diseño mejorado
 st.markdown(f"""
@@ -127,23 +405,19 @@ st.markdown(f"""
     </h3>
     <div style="display: flex; align-items: center; margin-top: 10px;">
         <div style="background-color: #4a86e8; color: white; font-weight: bold; padding: 8px 16px; border-radius: 20px; font-size: 18px;">
-            {len(df_filtrado)}
+            {num_viajes}
         </div>
         <p style="margin-left: 10px; font-size: 16px; color: #4a5568;">viajes analizados</p>
     </div>
 </div>
 """, unsafe_allow_html=True)
 
-# Dividir la pantalla en pestañas con un diseño mejorado
-st.markdown("""<div style="margin: 30px 0 20px 0;"><hr style='height:2px;border-width:0;color:#4a86e8;background-color:#4a86e8'></div>""", unsafe_allow_html=True)
-st.markdown("""<h2 style="color: #2a4365; margin-bottom: 20px;">Análisis interactivo</h2>""", unsafe_allow_html=True)
-tab1, tab2, tab3, tab4 = st.tabs(["📚 Caso de Estudio", "🗓️ Patrones y Destinos", "🏨 Alojamiento y Satisfacción", "🗺️ Duración y Distribución"])
+if STREAMING:
+    st.caption(f"Los diagramas de caja y el mapa usan una muestra aleatoria de {len(df):,} viajes.")
 
-with tab1:
-    # Mostrar el caso de estudio como primera pestaña
-    mostrar_caso_estudio()
+# Secciones del análisis: cada función solo se ejecuta cuando su sección está activa
+def mostrar_patrones_destinos(consulta):
 
-with tab2:
     # Crear dos columnas para los gráficos
     col1, col2 = st.columns(2)
 
@@ -151,39 +425,20 @@ with tab2:
         # 1. Patrones estacionales de viaje
         st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Patrones estacionales de viaje</h2>", unsafe_allow_html=True)
 
-        # Ordenar los meses cronológicamente
-        meses_orden = {
-            'January': 1, 'February': 2, 'March': 3, 'April': 4,
-            'May': 5, 'June': 6, 'July': 7, 'August': 8,
-            'September': 9, 'October': 10, 'November': 11, 'December': 12
-        }
-
-        # Contar viajes por mes y ordenar
-        viajes_por_mes = df_filtrado['mes_nombre'].value_counts().reset_index()
-        viajes_por_mes.columns = ['Mes', COL_NUM_VIAJES]
-        viajes_por_mes['orden_mes'] = viajes_por_mes['Mes'].map(meses_orden)
-        viajes_por_mes = viajes_por_mes.sort_values('orden_mes')
+        # Semanas y días se cuentan sobre las filas: con la ingesta por bloques solo hay una muestra
+        resolucion = st.radio(
+            "Resolución",
+            options=["Mensual"] if STREAMING else list(RESOLUCIONES),
+            horizontal=True
+        )
+        if STREAMING:
+            st.caption("Las resoluciones semanal y diaria no están disponibles con la ingesta por bloques.")
 
         # Crear gráfico de barras con nuevos colores y mayor contraste
-        fig_meses = px.bar(
-            viajes_por_mes,
-            x='Mes',
-            y=COL_NUM_VIAJES,
-            color=COL_NUM_VIAJES,
-            color_continuous_scale=['#E6EFF6', '#D4E6F1', '#A9CCE3', '#7FB3D5', '#5499C7', '#2980B9', '#1A5276'],
-            title='Número de viajes por mes'
-        )
-        fig_meses.update_layout(
-            xaxis_title='Mes', 
-            yaxis_title=COL_NUM_VIAJES,
-            coloraxis_colorbar=dict(title=COL_NUM_VIAJES),
-            plot_bgcolor='white'
-        )
-        st.plotly_chart(fig_meses, use_container_width=True)
+        mostrar_grafico("fig_meses", figura_consulta("fig_meses", consulta, resolucion))
 
         # Análisis de patrones estacionales
-        max_mes = viajes_por_mes.loc[viajes_por_mes[COL_NUM_VIAJES].idxmax()]
-        min_mes = viajes_por_mes.loc[viajes_por_mes[COL_NUM_VIAJES].idxmin()]
+        (mes_alto, viajes_alto), (mes_bajo, viajes_bajo) = consulta.temporadas(resolucion)
 
         # Tarjeta de insights con diseño mejorado
         st.markdown(f"""
@@ -194,13 +449,13 @@ with tab2:
             <ul style="margin-bottom: 0; padding-left: 20px;">
                 <li style="margin-bottom: 8px;">
                     <span style="color: #4a86e8; font-weight: bold;">Temporada alta:</span> 
-                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{max_mes['Mes']}</span> con 
-                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{max_mes[COL_NUM_VIAJES]}</span> viajes
+                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{mes_alto}</span> con 
+                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{viajes_alto}</span> viajes
                 </li>
                 <li>
                     <span style="color: #4a86e8; font-weight: bold;">Temporada baja:</span> 
-                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{min_mes['Mes']}</span> con 
-                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{min_mes[COL_NUM_VIAJES]}</span> viajes
+                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{mes_bajo}</span> con 
+                    <span style="background-color: #e6f2ff; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{viajes_bajo}</span> viajes
                 </li>
             </ul>
         </div>
@@ -211,27 +466,17 @@ with tab2:
         st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Destinos más populares</h2>", unsafe_allow_html=True)
 
         # Contar viajes por ciudad y obtener top 10
-        top_ciudades = df_filtrado['ciudad'].value_counts().nlargest(10).reset_index()
+        top_ciudades = consulta.top_ciudades(10).reset_index()
         top_ciudades.columns = ['Ciudad', COL_NUM_VIAJES]
 
         # Crear gráfico de barras horizontales con nuevos colores
-        fig_ciudades = px.bar(
-            top_ciudades,
-            y='Ciudad',
-            x=COL_NUM_VIAJES,
-            color=COL_NUM_VIAJES,
-            color_continuous_scale='Reds',
-            orientation='h',
-            title='Top 10 ciudades más visitadas'
-        )
-        fig_ciudades.update_layout(yaxis_title='Ciudad', xaxis_title=COL_NUM_VIAJES)
-        st.plotly_chart(fig_ciudades, use_container_width=True)
+        mostrar_grafico("fig_ciudades", figura_consulta("fig_ciudades", consulta))
 
         # Análisis de destinos populares
         top_ciudad = top_ciudades.iloc[0]
 
         # Tarjeta de insights con diseño mejorado
-        porcentaje_top3 = round(top_ciudades.iloc[:3][COL_NUM_VIAJES].sum() / df_filtrado.shape[0] * 100, 1)
+        porcentaje_top3 = consulta.concentracion(3)
         st.markdown(f"""
         <div style="background-color: #fdf2f2; border-left: 4px solid #e53e3e; padding: 15px; border-radius: 5px; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
             <h4 style="color: #c53030; margin-top: 0; display: flex; align-items: center; gap: 8px;">
@@ -251,7 +496,24 @@ with tab2:
         </div>
         """, unsafe_allow_html=True)
 
-with tab3:
+        # Con la ingesta por bloques se puede mantener un ranking global aproximado de memoria acotada
+        if STREAMING and cargar_ingesta().frecuentes is not None:
+            frecuentes = cargar_ingesta().frecuentes
+            with st.expander("Ciudades más frecuentes en todo el fichero (aproximado)"):
+                st.caption(
+                    f"Resumen Misra-Gries con {frecuentes.capacidad} contadores: cada ciudad tiene entre "
+                    f"el mínimo y el máximo indicados (error máximo {frecuentes.cota_error:,} viajes)."
+                )
+                st.dataframe(frecuentes.top(10), use_container_width=True)
+
+def mostrar_alojamiento_satisfaccion(consulta):
+    # Calcular los cuartiles en el servidor evita enviar todos los viajes a Plotly
+    box_precalculado = st.toggle(
+        "Calcular las estadísticas de las cajas en el servidor",
+        value=True,
+        help="Envía al navegador solo cuartiles, bigotes y una muestra de valores atípicos"
+    )
+
     # Crear dos columnas para los gráficos
     col1, col2 = st.columns(2)
 
@@ -260,20 +522,10 @@ with tab3:
         st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Relación entre tipo de alojamiento y gasto diario</h2>", unsafe_allow_html=True)
 
         # Crear diagrama de caja con nuevos colores
-        fig_alojamiento = px.box(
-            df_filtrado,
-            x='tipo_alojamiento',
-            y='gasto_diario',
-            color='tipo_alojamiento',
-            color_discrete_sequence=px.colors.qualitative.Pastel,
-            title='Gasto diario por tipo de alojamiento'
-        )
-        fig_alojamiento.update_layout(xaxis_title='Tipo de alojamiento', yaxis_title='Gasto diario (€)')
-        st.plotly_chart(fig_alojamiento, use_container_width=True)
+        mostrar_grafico("fig_alojamiento", figura_consulta("fig_alojamiento", consulta, box_precalculado))
 
         # Análisis de gasto por tipo de alojamiento
-        gasto_promedio = df_filtrado.groupby('tipo_alojamiento')['gasto_diario'].mean().reset_index()
-        gasto_promedio = gasto_promedio.sort_values('gasto_diario', ascending=False)
+        gasto_promedio = consulta.gasto_por_alojamiento().rename('gasto_diario').reset_index()
 
         # Tarjeta de insights con diseño mejorado
         max_gasto = round(gasto_promedio.iloc[0]['gasto_diario'], 2)
@@ -303,20 +555,10 @@ with tab3:
         st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Satisfacción del cliente por país</h2>", unsafe_allow_html=True)
 
         # Crear diagrama de caja con nuevos colores
-        fig_valoracion = px.box(
-            df_filtrado,
-            x='pais',
-            y='valoracion',
-            color='pais',
-            color_discrete_sequence=px.colors.qualitative.Bold,
-            title='Valoración por país (1-5)'
-        )
-        fig_valoracion.update_layout(xaxis_title='País', yaxis_title='Valoración')
-        st.plotly_chart(fig_valoracion, use_container_width=True)
+        mostrar_grafico("fig_valoracion", figura_consulta("fig_valoracion", consulta, box_precalculado))
 
         # Análisis de valoración por país
-        valoracion_promedio = df_filtrado.groupby('pais')['valoracion'].mean().reset_index()
-        valoracion_promedio = valoracion_promedio.sort_values('valoracion', ascending=False)
+        valoracion_promedio = consulta.valoracion_por_pais().rename('valoracion').reset_index()
 
         # Tarjeta de insights con diseño mejorado
         max_valoracion = round(valoracion_promedio.iloc[0]['valoracion'], 2)
@@ -341,7 +583,10 @@ with tab3:
         </div>
         """, unsafe_allow_html=True)
 
-with tab4:
+def mostrar_duracion_distribucion(consulta):
+    with perfil.etapa("filtro_filas"):
+        df_filtrado = consulta.filas()
+
     # Crear dos columnas para los gráficos
     col1, col2 = st.columns(2)
 
@@ -350,28 +595,18 @@ with tab4:
         st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Duración promedio de estancia por destino</h2>", unsafe_allow_html=True)
 
         # Calcular duración promedio por ciudad
-        duracion_promedio = df_filtrado.groupby('ciudad')['duracion_estancia'].mean().reset_index()
-        duracion_promedio = duracion_promedio.sort_values('duracion_estancia', ascending=False).head(10)
+        duracion_promedio = consulta.duracion_por_ciudad(10).reset_index()
         duracion_promedio.columns = ['Ciudad', COL_DURACION_DIAS]
 
         # Crear gráfico de barras con nuevos colores
-        fig_duracion = px.bar(
-            duracion_promedio,
-            x='Ciudad',
-            y=COL_DURACION_DIAS,
-            color=COL_DURACION_DIAS,
-            color_continuous_scale='Greens',
-            title='Top 10 ciudades con mayor duración de estancia'
-        )
-        fig_duracion.update_layout(xaxis_title='Ciudad', yaxis_title=COL_DURACION_DIAS)
-        st.plotly_chart(fig_duracion, use_container_width=True)
+        mostrar_grafico("fig_duracion", figura_consulta("fig_duracion", consulta))
 
         # Análisis de duración de estancia
         top_duracion = duracion_promedio.iloc[0]
 
         # Tarjeta de insights con diseño mejorado
         max_duracion = round(top_duracion[COL_DURACION_DIAS], 1)
-        promedio_general = round(df_filtrado['duracion_estancia'].mean(), 1)
+        promedio_general = round(consulta.media_global('duracion_estancia'), 1)
         st.markdown(f"""
         <div style="background-color: #f0fff4; border-left: 4px solid #48bb78; padding: 15px; border-radius: 5px; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
             <h4 style="color: #2f855a; margin-top: 0; display: flex; align-items: center; gap: 8px;">
@@ -395,58 +630,89 @@ with tab4:
         # 6. Distribución geográfica de los viajes
         st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Distribución geográfica de los viajes</h2>", unsafe_allow_html=True)
 
-        # Crear mapa
-        m = folium.Map(location=[48.8566, 2.3522], zoom_start=4)
-
-        # Diccionario de colores por país
-        colores_paises = {
-            'España': 'red',
-            'Francia': 'blue',
-            'Italia': 'green',
-            'Alemania': 'purple',
-            'Reino Unido': 'orange'
-        }
-
-        # Añadir marcadores al mapa
-        for idx, row in df_filtrado.iterrows():
-            folium.CircleMarker(
-                location=[row['latitud'], row['longitud']],
-                radius=row['duracion_estancia'] / 3,  # Tamaño proporcional a la duración
-                color=colores_paises.get(row['pais'], 'gray'),
-                fill=True,
-                fill_color=colores_paises.get(row['pais'], 'gray'),
-                fill_opacity=0.7,
-                popup=f"""
-                <b>{row['ciudad']}, {row['pais']}</b><br>
-                Fecha: {row['fecha'].strftime('%d-%m-%Y')}<br>
-                Alojamiento: {row['tipo_alojamiento']}<br>
-                Duración: {row['duracion_estancia']} días<br>
-                Gasto diario: {row['gasto_diario']}€<br>
-                Valoración: {row['valoracion']}/5<br>
-                Motivo: {row['motivo_viaje']}
-                """
-            ).add_to(m)
-
-        # Añadir leyenda
-        legend_html = """
-        <div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000; background-color: white; padding: 10px; border: 1px solid grey; border-radius: 5px;">
-        <p><b>Países:</b></p>
-        """
-
-        for pais, color in colores_paises.items():
-            legend_html += f"""
-            <p><i class="fa fa-circle" style="color:{color}"></i> {pais}</p>
-            """
-
-        legend_html += """
-        <p><b>Tamaño:</b> Duración de la estancia</p>
-        </div>
-        """
-
-        m.get_root().html.add_child(folium.Element(legend_html))
+        # Selección del modo de visualización del mapa
+        modo_mapa = st.radio(
+            "Modo de visualización",
+            options=["Por ciudad", "Agrupado", "Detalle por viaje", "Todos los viajes"],
+            horizontal=True
+        )
+        carga_progresiva = st.toggle(
+            "Carga progresiva del mapa",
+            value=True,
+            help="Muestra un resumen por ciudad al instante y el mapa en cuanto termina de generarse"
+        )
 
-        # Mostrar mapa
-        folium_static(m, width=700, height=500)
+        zoom = None
+        if modo_mapa == "Por ciudad":
+            ciudad_detalle = None
+            viajes_mapa = None
+        elif modo_mapa == "Agrupado":
+            # Los viajes se agrupan en una rejilla que depende del nivel de zoom
+            ciudad_detalle = None
+            viajes_mapa = None
+            zoom = st.slider("Nivel de zoom", min_value=ZOOM_MINIMO, max_value=ZOOM_MAXIMO, value=4)
+        elif modo_mapa == "Detalle por viaje":
+            # Detalle de los viajes de la ciudad seleccionada
+            ciudad_detalle = st.selectbox(
+                "Seleccionar ciudad",
+                options=sorted(df_filtrado['ciudad'].unique())
+            )
+            viajes_mapa = df_filtrado[df_filtrado['ciudad'] == ciudad_detalle]
+        else:
+            ciudad_detalle = None
+            viajes_mapa = df_filtrado
+
+        clave_filtro = clave_seleccion(consulta.selecciones, consulta.rango)
+
+        # Los viajes que comparten coordenadas se separan con `dispersar` para que no se apilen
+        if viajes_mapa is not None and usar_mapa_webgl(viajes_mapa):
+            # Con muchos viajes, una capa WebGL evita un elemento del DOM por marcador
+            def construir_figura_mapa():
+                with perfil.etapa("mapa_construccion"):
+                    return crear_mapa_plotly(dispersar(viajes_mapa))
+
+            fig_mapa = figura_cacheada(
+                clave_derivada(consulta, 'fig_mapa', modo_mapa, ciudad_detalle),
+                construir_figura_mapa
+            )
+            mostrar_grafico("fig_mapa", fig_mapa)
+        else:
+            cache_clusters = obtener_cache_clusters()
+
+            def construir_mapa(perfil_mapa=perfil):
+                with perfil_mapa.etapa("mapa_construccion"):
+                    if zoom is not None:
+                        # Los clusters de cada nivel se calculan una vez por combinación de filtros
+                        clusters = cache_clusters.get_or_set(
+                            clave_filtro, lambda: ClustersPorZoom(df_filtrado)
+                        )
+                        m = crear_mapa_clusters(clusters.nivel(zoom), zoom)
+                    elif viajes_mapa is None:
+                        # Un marcador por ciudad con los viajes agregados
+                        m = mapa_ciudades(consulta)
+                    else:
+                        m = crear_mapa_viajes(dispersar(viajes_mapa))
+                with perfil_mapa.etapa("mapa_serializacion"):
+                    return renderizar_html(m)
+
+            # Reutilizar el HTML ya generado para la misma combinación de filtros (memoria y disco)
+            partes = (modo_mapa, ciudad_detalle, zoom)
+            html_mapa = html_mapa_guardado(consulta, *partes)
+            if html_mapa is None and carga_progresiva:
+                # Fuera del script el perfilador de esta ejecución ya no es válido: se construye sin medir
+                sin_perfil = Perfilador(False, None)
+                futuro = mapa_en_segundo_plano(
+                    clave_filtro + partes,
+                    lambda: html_mapa_cacheado(consulta, lambda: construir_mapa(sin_perfil), *partes)
+                )
+                mostrar_mapa_progresivo(futuro, df_filtrado)
+            else:
+                if html_mapa is None:
+                    html_mapa = html_mapa_cacheado(consulta, construir_mapa, *partes)
+                perfil.payload("mapa_html", html_mapa)
+
+                # Mostrar mapa
+                components.html(html_mapa, width=ANCHO_MAPA, height=ALTO_MAPA + 10)
 
         # Tarjeta de insights con diseño mejorado
         st.markdown("""
@@ -465,12 +731,90 @@ with tab4:
                 </li>
                 <li>
                     <span style="color: #805ad5; font-weight: bold;">Interacción:</span> 
-                    Haz clic en un punto para ver detalles del viaje
+                    Haz clic o pasa el cursor sobre un punto para ver el resumen de la ciudad o los detalles del viaje
                 </li>
             </ul>
         </div>
         """, unsafe_allow_html=True)
 
+def mostrar_transporte(consulta):
+    # Reparto mensual por medio de transporte a partir de los conteos cruzados mes x transporte
+    st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Medios de transporte a lo largo del año</h2>", unsafe_allow_html=True)
+    mostrar_grafico("fig_transporte", figura_consulta("fig_transporte", consulta))
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Gasto diario por medio de transporte</h2>", unsafe_allow_html=True)
+        mostrar_grafico("fig_gasto_transporte", figura_consulta("fig_gasto_transporte", consulta))
+
+    with col2:
+        st.markdown("<h2 style='font-size: 28px; color: #1a365d;'>Satisfacción por medio de transporte</h2>", unsafe_allow_html=True)
+        mostrar_grafico("fig_valoracion_transporte", figura_consulta("fig_valoracion_transporte", consulta))
+
+    # Tarjeta de insights con diseño mejorado
+    conteo = consulta.conteo_transporte()
+    (transporte_principal, viajes_principal), _ = extremos(conteo)
+    cuota_principal = round(viajes_principal / conteo.sum() * 100, 1)
+    (transporte_caro, gasto_caro), _ = extremos(consulta.gasto_por_transporte())
+    (transporte_valorado, valoracion_alta), _ = extremos(consulta.valoracion_por_transporte())
+    st.markdown(f"""
+    <div style="background-color: #fffaf0; border-left: 4px solid #dd6b20; padding: 15px; border-radius: 5px; margin-top: 20px; box-shadow: 0 2px 5px rgba(0,0,0,0.1);">
+        <h4 style="color: #c05621; margin-top: 0; display: flex; align-items: center; gap: 8px;">
+            <span style="font-size: 20px;">🚆</span> Insights de Transporte
+        </h4>
+        <ul style="margin-bottom: 0; padding-left: 20px;">
+            <li style="margin-bottom: 8px;">
+                <span style="color: #dd6b20; font-weight: bold;">Más utilizado:</span> 
+                <span style="background-color: #feebc8; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{transporte_principal}</span> con el 
+                <span style="background-color: #feebc8; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{cuota_principal}%</span> de los viajes
+            </li>
+            <li style="margin-bottom: 8px;">
+                <span style="color: #dd6b20; font-weight: bold;">Mayor gasto:</span> 
+                quienes viajan en <span style="background-color: #feebc8; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{transporte_caro}</span> con 
+                <span style="background-color: #feebc8; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{round(gasto_caro, 2)}€</span> diarios
+            </li>
+            <li>
+                <span style="color: #dd6b20; font-weight: bold;">Mejor valorado:</span> 
+                <span style="background-color: #feebc8; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{transporte_valorado}</span> con 
+                <span style="background-color: #feebc8; padding: 2px 6px; border-radius: 3px; font-weight: bold;">{round(valoracion_alta, 2)}/5</span> puntos
+            </li>
+        </ul>
+    </div>
+    """, unsafe_allow_html=True)
+
+def mostrar_seccion_caso_estudio(consulta):
+    mostrar_caso_estudio()
+
+SECCIONES = {
+    "📚 Caso de Estudio": mostrar_seccion_caso_estudio,
+    "🗓️ Patrones y Destinos": mostrar_patrones_destinos,
+    "🏨 Alojamiento y Satisfacción": mostrar_alojamiento_satisfaccion,
+    "🗺️ Duración y Distribución": mostrar_duracion_distribucion,
+    "🚆 Transporte": mostrar_transporte,
+}
+
+# Navegación entre secciones con un diseño mejorado
+st.markdown("""<div style="margin: 30px 0 20px 0;"><hr style='height:2px;border-width:0;color:#4a86e8;background-color:#4a86e8'></div>""", unsafe_allow_html=True)
+st.markdown("""<h2 style="color: #2a4365; margin-bottom: 20px;">Análisis interactivo</h2>""", unsafe_allow_html=True)
+seccion = st.radio(
+    "Sección",
+    options=list(SECCIONES),
+    horizontal=True,
+    key="seccion",
+    label_visibility="collapsed"
+)
+
+# Solo se calcula y dibuja la sección activa
+with perfil.etapa(f"seccion {seccion}"):
+    # Sin viajes no hay máximos ni medias: las secciones de análisis se sustituyen por un aviso
+    if num_viajes == 0 and SECCIONES[seccion] is not mostrar_seccion_caso_estudio:
+        st.info("Ningún viaje cumple los filtros seleccionados. Amplía la selección para ver el análisis.")
+    else:
+        SECCIONES[seccion](consulta)
+
+perfil.finalizar()
+
 # Se ha eliminado la sección de Conclusiones e Insights Clave
 
 # Se ha eliminado el pie de página
\ No newline at end of file
@@ -0,0 +1,193 @@
+"""Benchmark del pipeline de datos del dashboard sobre datos sintéticos escalados.
+
+Genera viajes con el esquema y las distribuciones del CSV incluido y mide, para
+cada tamaño, el tiempo, el pico de memoria y el tamaño del resultado serializado
+de cada etapa. Los resultados se guardan en JSON para comparar entre commits.
+
+Uso:
+    python benchmarks/bench_pipeline.py --tamanos 10000 100000 --salida resultados.json
+"""
+import argparse
+import datetime
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, RAIZ)
+
+from cubo import construir_cubo, conteo_por, media_global, media_por  # noqa: E402
+from datos import RUTA_DATOS, cargar_viajes  # noqa: E402
+from filtros import IndiceFiltros  # noqa: E402
+from graficos import crear_box_precalculado, estadisticas_caja  # noqa: E402
+from mapa import agregar_por_ciudad, crear_mapa_ciudades, crear_mapa_viajes, renderizar_html  # noqa: E402
+from topk import FrecuentesMisraGries, top_serie  # noqa: E402
+
+TAMANOS = [10_000, 100_000, 1_000_000, 10_000_000]
+
+# Por encima de este número de viajes no se construye el mapa con un marcador por viaje
+MAX_MARCADORES = 20_000
+
+
+def generar_viajes(n, semilla=0, ruta_base=os.path.join(RAIZ, RUTA_DATOS)):
+    """Viajes sintéticos remuestreando las distribuciones del CSV original."""
+    rng = np.random.default_rng(semilla)
+    base = pd.read_csv(ruta_base)
+    # Ubicación remuestreada de forma conjunta para mantener ciudad y coordenadas coherentes
+    ubicaciones = base[['pais', 'ciudad', 'latitud', 'longitud']]
+    filas = rng.integers(0, len(base), n)
+    df = ubicaciones.iloc[filas].reset_index(drop=True)
+    for columna in ['tipo_alojamiento', 'duracion_estancia', 'gasto_diario',
+                    'valoracion', 'transporte', 'motivo_viaje']:
+        df[columna] = base[columna].to_numpy()[rng.integers(0, len(base), n)]
+    dias = rng.integers(0, 365, n)
+    df.insert(0, 'fecha', (np.datetime64('2023-01-01') + dias).astype('datetime64[D]').astype(str))
+    return df[base.columns]
+
+
+def medir(resultados, tamano, etapa, funcion):
+    """Ejecuta una etapa midiendo tiempo y pico de memoria; devuelve su resultado."""
+    tracemalloc.start()
+    inicio = time.perf_counter()
+    valor, payload = funcion()
+    segundos = time.perf_counter() - inicio
+    _, pico = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    resultados.append({
+        'filas': tamano,
+        'etapa': etapa,
+        'segundos': round(segundos, 6),
+        'pico_memoria_bytes': pico,
+        'payload_bytes': payload,
+    })
+    print(f"{tamano:>10,} {etapa:<28} {segundos:>9.3f}s {pico / 1e6:>9.1f} MB"
+          + (f" {payload / 1e3:>10.1f} KB" if payload is not None else ""))
+    return valor
+
+
+def ejecutar(tamano, directorio, resultados, max_marcadores=MAX_MARCADORES):
+    ruta = os.path.join(directorio, f'viajes_{tamano}.csv')
+    generar_viajes(tamano).to_csv(ruta, index=False)
+
+    # Carga en frío (CSV) y en caliente (cache Parquet)
+    df = medir(resultados, tamano, 'carga_csv', lambda: (cargar_viajes(ruta), None))
+    df = medir(resultados, tamano, 'carga_parquet', lambda: (cargar_viajes(ruta), None))
+
+    paises = list(df['pais'].cat.categories[:3])
+    selecciones = {
+        'pais': paises,
+        'tipo_alojamiento': list(df['tipo_alojamiento'].cat.categories),
+        'motivo_viaje': list(df['motivo_viaje'].cat.categories[:2]),
+    }
+
+    # Filtro original con isin frente al índice categórico
+    medir(resultados, tamano, 'filtro_isin', lambda: (df[
+        df['pais'].isin(selecciones['pais']) &
+        df['tipo_alojamiento'].isin(selecciones['tipo_alojamiento']) &
+        df['motivo_viaje'].isin(selecciones['motivo_viaje'])
+    ], None))
+    indice = medir(resultados, tamano, 'indice_construccion', lambda: (IndiceFiltros(df), None))
+    df_filtrado = medir(resultados, tamano, 'filtro_indice', lambda: (indice.filtrar(selecciones), None))
+
+    # Agregaciones por pestaña sobre las filas frente al cubo precalculado
+    def groupbys():
+        df_filtrado['mes'].value_counts()
+        df_filtrado['ciudad'].value_counts().nlargest(10)
+        df_filtrado.groupby('tipo_alojamiento', observed=True)['gasto_diario'].mean()
+        df_filtrado.groupby('pais', observed=True)['valoracion'].mean()
+        df_filtrado.groupby('ciudad', observed=True)['duracion_estancia'].mean()
+        return df_filtrado['duracion_estancia'].mean(), None
+    medir(resultados, tamano, 'groupbys_filas', groupbys)
+    indice_cubo = medir(resultados, tamano, 'cubo_construccion',
+                        lambda: (IndiceFiltros(construir_cubo(df)), None))
+
+    def consultas_cubo():
+        cubo = indice_cubo.filtrar(selecciones)
+        conteo_por(cubo, 'mes')
+        conteo_por(cubo, 'ciudad').head(10)
+        media_por(cubo, 'tipo_alojamiento', 'gasto_diario')
+        media_por(cubo, 'pais', 'valoracion')
+        media_por(cubo, 'ciudad', 'duracion_estancia')
+        return media_global(cubo, 'duracion_estancia'), None
+    medir(resultados, tamano, 'consultas_cubo', consultas_cubo)
+
+    # Top 10 de ciudades: orden completo frente a selección parcial y resumen de memoria acotada
+    conteos_ciudad = df_filtrado['ciudad'].value_counts(sort=False)
+    medir(resultados, tamano, 'top_ciudades_orden',
+          lambda: (conteos_ciudad.sort_values(ascending=False).head(10), None))
+    medir(resultados, tamano, 'top_ciudades_argpartition',
+          lambda: (top_serie(conteos_ciudad.to_numpy(), conteos_ciudad.index, 10), None))
+    medir(resultados, tamano, 'frecuentes_misra_gries',
+          lambda: (FrecuentesMisraGries(100).actualizar(df['ciudad']), None))
+
+    # Construcción y serialización de figuras
+    def figura_barras():
+        conteos = conteo_por(indice_cubo.filtrar(selecciones), 'ciudad').head(10).reset_index()
+        json_fig = px.bar(conteos, x='viajes', y='ciudad', orientation='h').to_json()
+        return None, len(json_fig)
+    medir(resultados, tamano, 'figura_barras', figura_barras)
+    medir(resultados, tamano, 'figura_box_px', lambda: (None, len(px.box(
+        df_filtrado, x='tipo_alojamiento', y='gasto_diario', color='tipo_alojamiento'
+    ).to_json())))
+    medir(resultados, tamano, 'figura_box_servidor', lambda: (None, len(crear_box_precalculado(
+        estadisticas_caja(df_filtrado, 'tipo_alojamiento', 'gasto_diario'),
+        titulo='', colores=px.colors.qualitative.Pastel
+    ).to_json())))
+
+    # Mapas: agregado por ciudad y, si no es demasiado grande, un marcador por viaje
+    medir(resultados, tamano, 'mapa_ciudades', lambda: (None, len(renderizar_html(
+        crear_mapa_ciudades(agregar_por_ciudad(df_filtrado))
+    ))))
+    if len(df_filtrado) <= max_marcadores:
+        medir(resultados, tamano, 'mapa_viajes', lambda: (None, len(renderizar_html(
+            crear_mapa_viajes(df_filtrado)
+        ))))
+
+
+def commit_actual():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=RAIZ,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--tamanos', type=int, nargs='+', default=TAMANOS,
+                        help='Número de viajes sintéticos de cada ejecución')
+    parser.add_argument('--salida', default='bench_resultados.json',
+                        help='Fichero JSON con los resultados')
+    parser.add_argument('--max-marcadores', type=int, default=MAX_MARCADORES,
+                        help='Máximo de viajes para medir el mapa con un marcador por viaje')
+    args = parser.parse_args(argv)
+
+    resultados = []
+    with tempfile.TemporaryDirectory() as directorio:
+        for tamano in args.tamanos:
+            ejecutar(tamano, directorio, resultados, args.max_marcadores)
+
+    informe = {
+        'commit': commit_actual(),
+        'fecha': datetime.datetime.now().isoformat(timespec='seconds'),
+        'python': sys.version.split()[0],
+        'pandas': pd.__version__,
+        'resultados': resultados,
+    }
+    with open(args.salida, 'w', encoding='utf-8') as f:
+        json.dump(informe, f, indent=2)
+    print(f"Resultados guardados en {args.salida}")
+
+
+if __name__ == '__main__':
+    main()
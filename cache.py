@@ -0,0 +1,161 @@
+import hashlib
+import os
+import pickle
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+# Cache en disco compartida entre procesos
+RUTA_CACHE_DISCO = os.environ.get('TURISMO_CACHE_DISCO', '.cache/turismo.sqlite')
+MAX_MB_CACHE_DISCO = float(os.environ.get('TURISMO_CACHE_DISCO_MB', 256))
+
+# Segundos mínimos entre dos actualizaciones del acceso de una entrada: las lecturas
+# frecuentes no escriben y los procesos no se serializan en el bloqueo de escritura
+INTERVALO_ACCESO = 60
+
+
+def clave_filtros(*selecciones):
+    """Normaliza las selecciones de los filtros en una tupla ordenada y hashable."""
+    return tuple(tuple(sorted(str(valor) for valor in seleccion)) for seleccion in selecciones)
+
+
+class CacheLRU:
+    """Cache LRU compartida entre sesiones, limitada por entradas y por memoria."""
+
+    def __init__(self, max_entradas=32, max_bytes=64 * 1024 * 1024):
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self._datos = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, clave):
+        with self._lock:
+            if clave not in self._datos:
+                return None
+            self._datos.move_to_end(clave)
+            return self._datos[clave][0]
+
+    def set(self, clave, valor):
+        tamano = sys.getsizeof(valor)
+        with self._lock:
+            if clave in self._datos:
+                self._bytes -= self._datos.pop(clave)[1]
+            # Un valor más grande que todo el presupuesto no se guarda
+            if tamano > self.max_bytes:
+                return valor
+            self._datos[clave] = (valor, tamano)
+            self._bytes += tamano
+            # Expulsar las entradas menos usadas hasta respetar ambos límites
+            while len(self._datos) > self.max_entradas or self._bytes > self.max_bytes:
+                _, (_, tamano_expulsado) = self._datos.popitem(last=False)
+                self._bytes -= tamano_expulsado
+        return valor
+
+    def get_or_set(self, clave, construir):
+        valor = self.get(clave)
+        if valor is None:
+            valor = self.set(clave, construir())
+        return valor
+
+    @property
+    def bytes_usados(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._datos)
+
+
+class CacheDisco:
+    """Cache persistente en SQLite compartida entre procesos, limitada por tamaño total.
+
+    Los valores se guardan serializados con pickle; al superar `max_bytes` se
+    eliminan las entradas con el acceso más antiguo. El acceso se guarda con una
+    resolución de `intervalo_acceso` segundos.
+    """
+
+    def __init__(self, ruta, max_bytes=256 * 1024 * 1024, intervalo_acceso=INTERVALO_ACCESO):
+        self.ruta = ruta
+        self.max_bytes = max_bytes
+        self.intervalo_acceso = intervalo_acceso
+        try:
+            directorio = os.path.dirname(ruta)
+            if directorio:
+                os.makedirs(directorio, exist_ok=True)
+            with self._conectar() as conexion:
+                conexion.execute("PRAGMA journal_mode=WAL")
+                conexion.execute(
+                    "CREATE TABLE IF NOT EXISTS entradas ("
+                    "clave TEXT PRIMARY KEY, valor BLOB NOT NULL, bytes INTEGER NOT NULL, acceso REAL NOT NULL)"
+                )
+                conexion.execute("CREATE INDEX IF NOT EXISTS idx_acceso ON entradas (acceso)")
+            self.disponible = True
+        except (OSError, sqlite3.Error):
+            # Sin disco escribible la cache se desactiva y todo se calcula en memoria
+            self.disponible = False
+
+    @contextmanager
+    def _conectar(self):
+        conexion = sqlite3.connect(self.ruta, timeout=5)
+        try:
+            with conexion:
+                yield conexion
+        finally:
+            conexion.close()
+
+    @staticmethod
+    def _clave(clave):
+        return hashlib.sha256(repr(clave).encode('utf-8')).hexdigest()
+
+    def get(self, clave):
+        if not self.disponible:
+            return None
+        clave = self._clave(clave)
+        try:
+            with self._conectar() as conexion:
+                fila = conexion.execute("SELECT valor, acceso FROM entradas WHERE clave = ?", (clave,)).fetchone()
+                if fila is None:
+                    return None
+                ahora = time.time()
+                if ahora - fila[1] > self.intervalo_acceso:
+                    conexion.execute("UPDATE entradas SET acceso = ? WHERE clave = ?", (ahora, clave))
+            return pickle.loads(fila[0])
+        except (sqlite3.Error, pickle.UnpicklingError, EOFError):
+            return None
+
+    def set(self, clave, valor):
+        if not self.disponible:
+            return valor
+        datos = pickle.dumps(valor, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(datos) > self.max_bytes:
+            return valor
+        try:
+            with self._conectar() as conexion:
+                conexion.execute(
+                    "INSERT OR REPLACE INTO entradas (clave, valor, bytes, acceso) VALUES (?, ?, ?, ?)",
+                    (self._clave(clave), datos, len(datos), time.time())
+                )
+                self._expulsar(conexion)
+        except sqlite3.Error:
+            pass  # La cache en disco es opcional: si falla se sigue sin ella
+        return valor
+
+    def _expulsar(self, conexion):
+        total = conexion.execute("SELECT COALESCE(SUM(bytes), 0) FROM entradas").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for clave, tamano in conexion.execute("SELECT clave, bytes FROM entradas ORDER BY acceso").fetchall():
+            conexion.execute("DELETE FROM entradas WHERE clave = ?", (clave,))
+            total -= tamano
+            if total <= self.max_bytes:
+                break
+
+    def get_or_set(self, clave, construir):
+        valor = self.get(clave)
+        if valor is None:
+            valor = self.set(clave, construir())
+        return valor
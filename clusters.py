@@ -0,0 +1,78 @@
+import numpy as np
+import pandas as pd
+
+# Celdas de la rejilla por cada tesela del mapa en un nivel de zoom
+CELDAS_POR_TESELA = 4
+ZOOM_MINIMO = 3
+ZOOM_MAXIMO = 12
+
+# Separación de los viajes que comparten coordenadas al dispersarlos (en grados)
+PASO_DISPERSION = 0.0015
+ANGULO_AUREO = np.pi * (3 - np.sqrt(5))
+
+
+class ClustersPorZoom:
+    """Agrupa los viajes en una rejilla por nivel de zoom y memoriza cada nivel calculado.
+
+    Cada celda de la rejilla se convierte en un nodo con el número de viajes, su
+    centroide, la duración media y el país predominante.
+    """
+
+    def __init__(self, df):
+        self.latitud = df['latitud'].to_numpy(dtype=np.float64)
+        self.longitud = df['longitud'].to_numpy(dtype=np.float64)
+        self.duracion = df['duracion_estancia'].to_numpy(dtype=np.float64)
+        self.codigos_pais, self.paises = pd.factorize(df['pais'])
+        self.codigos_ciudad, self.ciudades = pd.factorize(df['ciudad'])
+        self._niveles = {}
+
+    def nivel(self, zoom):
+        if zoom not in self._niveles:
+            self._niveles[zoom] = self._calcular(zoom)
+        return self._niveles[zoom]
+
+    def _calcular(self, zoom):
+        columnas = ['latitud', 'longitud', 'viajes', 'duracion_media', 'pais', 'ciudades']
+        if not len(self.latitud):
+            return pd.DataFrame(columns=columnas)
+        tamano_celda = 360 / (2 ** zoom * CELDAS_POR_TESELA)
+        celda_x = np.floor((self.longitud + 180) / tamano_celda).astype(np.int64)
+        celda_y = np.floor((self.latitud + 90) / tamano_celda).astype(np.int64)
+        celdas, cluster = np.unique(celda_x * (2 ** 31) + celda_y, return_inverse=True)
+        n_clusters = len(celdas)
+
+        viajes = np.bincount(cluster, minlength=n_clusters)
+        latitud = np.bincount(cluster, weights=self.latitud, minlength=n_clusters) / viajes
+        longitud = np.bincount(cluster, weights=self.longitud, minlength=n_clusters) / viajes
+        duracion = np.bincount(cluster, weights=self.duracion, minlength=n_clusters) / viajes
+
+        # País predominante: conteo por (cluster, país) y máximo por fila
+        por_pais = np.zeros((n_clusters, len(self.paises)), dtype=np.int64)
+        np.add.at(por_pais, (cluster, self.codigos_pais), 1)
+        pais = np.asarray(self.paises)[por_pais.argmax(axis=1)]
+
+        # Número de ciudades distintas en cada cluster
+        pares = np.unique(cluster * len(self.ciudades) + self.codigos_ciudad)
+        ciudades = np.bincount(pares // len(self.ciudades), minlength=n_clusters)
+
+        return pd.DataFrame({
+            'latitud': latitud,
+            'longitud': longitud,
+            'viajes': viajes,
+            'duracion_media': duracion,
+            'pais': pais,
+            'ciudades': ciudades,
+        }, columns=columnas)
+
+
+def dispersar(df, paso=PASO_DISPERSION):
+    """Separa los viajes con las mismas coordenadas en una espiral alrededor del punto original."""
+    if not len(df):
+        return df
+    rango = df.groupby(['latitud', 'longitud'], sort=False).cumcount().to_numpy()
+    radio = paso * np.sqrt(rango)
+    angulo = rango * ANGULO_AUREO
+    df = df.copy()
+    df['latitud'] = df['latitud'].to_numpy(dtype=np.float64) + radio * np.sin(angulo)
+    df['longitud'] = df['longitud'].to_numpy(dtype=np.float64) + radio * np.cos(angulo)
+    return df
@@ -0,0 +1,53 @@
+import numpy as np
+import pandas as pd
+
+# Dimensiones y medidas del cubo de agregación
+DIMENSIONES = ['pais', 'ciudad', 'tipo_alojamiento', 'motivo_viaje', 'transporte', 'mes']
+MEDIDAS = ['gasto_diario', 'duracion_estancia', 'valoracion']
+
+# Pares de dimensiones cuyos viajes se necesitan cruzados (por ejemplo, el reparto del transporte por mes)
+PARES = [('mes', 'transporte')]
+
+
+def construir_cubo(df, dimensiones=DIMENSIONES, medidas=MEDIDAS):
+    """Precalcula conteos y sumas por cada combinación de dimensiones.
+
+    Cualquier conteo o media de los gráficos se obtiene después
+    sumando las celdas que cumplen el filtro, sin volver a recorrer los viajes.
+    """
+    valores = {'viajes': np.ones(len(df), dtype=np.int64)}
+    for medida in medidas:
+        valores[f'suma_{medida}'] = df[medida].to_numpy(dtype=np.float64)
+    celdas = pd.DataFrame(valores, index=df.index)
+    for dimension in dimensiones:
+        celdas[dimension] = df[dimension]
+    return celdas.groupby(dimensiones, observed=True, sort=False).sum().reset_index()
+
+
+def combinar_cubos(*cubos, dimensiones=DIMENSIONES):
+    """Suma varios cubos con las mismas dimensiones (por ejemplo, de distintos bloques de datos)."""
+    return (
+        pd.concat(cubos, ignore_index=True)
+        .groupby(dimensiones, observed=True, sort=False)
+        .sum()
+        .reset_index()
+    )
+
+
+def conteo_por(cubo, dimension):
+    """Número de viajes por valor de la dimensión, de mayor a menor."""
+    return (
+        cubo.groupby(dimension, observed=True)['viajes']
+        .sum()
+        .sort_values(ascending=False)
+    )
+
+
+def media_por(cubo, dimension, medida):
+    """Media de la medida por valor de la dimensión, de mayor a menor."""
+    sumas = cubo.groupby(dimension, observed=True)[['viajes', f'suma_{medida}']].sum()
+    return (sumas[f'suma_{medida}'] / sumas['viajes']).sort_values(ascending=False)
+
+
+def media_global(cubo, medida):
+    return cubo[f'suma_{medida}'].sum() / cubo['viajes'].sum()
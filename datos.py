@@ -0,0 +1,152 @@
+import calendar
+import hashlib
+import json
+import logging
+import os
+
+import pandas as pd
+
+RUTA_DATOS = "data/DOC03_Datos_U2_IDSD_VIS_TOM_DEC_542_CE.csv"
+
+# Se incrementa cuando cambia el contenido o los tipos de la cache Parquet
+VERSION_CACHE = 3
+
+# Nombres de los meses en orden cronológico; se asignan una sola vez a los 12 meses
+MESES = list(calendar.month_name)[1:]
+
+# Tipo más estrecho para cada columna del dataframe de viajes
+ESQUEMA = {
+    'pais': 'category',
+    'ciudad': 'category',
+    'latitud': 'float32',
+    'longitud': 'float32',
+    'tipo_alojamiento': 'category',
+    'duracion_estancia': 'int16',
+    'gasto_diario': 'float64',
+    'valoracion': 'int8',
+    'transporte': 'category',
+    'motivo_viaje': 'category',
+    'mes': 'int8',
+}
+
+logger = logging.getLogger(__name__)
+
+
+def memoria(df):
+    """Memoria ocupada por el dataframe en bytes, incluyendo el contenido de las cadenas."""
+    return int(df.memory_usage(deep=True).sum())
+
+
+def aplicar_esquema(df):
+    """Convierte cada columna a su tipo más estrecho."""
+    return df.astype({columna: tipo for columna, tipo in ESQUEMA.items() if columna in df.columns})
+
+
+def informar_memoria(df):
+    """Registra en el log la memoria ahorrada por el esquema compacto."""
+    info = df.attrs.get('memoria')
+    if info:
+        logger.info(
+            "Esquema compacto: %.2f MB -> %.2f MB (%.2f MB ahorrados)",
+            info['antes'] / 1e6, info['despues'] / 1e6, (info['antes'] - info['despues']) / 1e6
+        )
+    return df
+
+
+def enriquecer(df):
+    """Añade las columnas derivadas de la fecha y aplica el esquema de la aplicación."""
+    df['fecha'] = pd.to_datetime(df['fecha'])
+    df['mes'] = df['fecha'].dt.month
+    return aplicar_esquema(df)
+
+
+def leer_csv(ruta=RUTA_DATOS):
+    """Lee el CSV completo y anota en `attrs` la memoria antes y después del esquema compacto.
+
+    La medición recorre las cadenas, así que solo se hace aquí y no en cada
+    bloque de la ingesta; la cache Parquet conserva el resultado.
+    """
+    crudo = pd.read_csv(ruta)
+    antes = memoria(crudo)
+    df = enriquecer(crudo)
+    df.attrs['memoria'] = {'antes': antes, 'despues': memoria(df)}
+    return df
+
+
+def _hash_archivo(ruta):
+    sha = hashlib.sha256()
+    with open(ruta, 'rb') as f:
+        for bloque in iter(lambda: f.read(1024 * 1024), b''):
+            sha.update(bloque)
+    return sha.hexdigest()
+
+
+def _rutas_cache(ruta):
+    base = os.path.splitext(ruta)[0]
+    return base + '.parquet', base + '.parquet.json'
+
+
+def _cache_valida(ruta, ruta_meta, estado):
+    """Comprueba si la cache corresponde al CSV actual (mtime y tamaño, o hash)."""
+    try:
+        with open(ruta_meta, encoding='utf-8') as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    if meta.get('version') != VERSION_CACHE:
+        return False
+    if meta.get('mtime_ns') == estado.st_mtime_ns and meta.get('tamano') == estado.st_size:
+        return True
+    # El mtime cambia en cada despliegue aunque el contenido sea el mismo
+    sha256 = _hash_archivo(ruta)
+    if meta.get('sha256') != sha256:
+        return False
+    _guardar_meta(ruta_meta, estado, sha256)
+    return True
+
+
+def _guardar_meta(ruta_meta, estado, sha256):
+    meta = {'version': VERSION_CACHE, 'mtime_ns': estado.st_mtime_ns, 'tamano': estado.st_size, 'sha256': sha256}
+    temporal = ruta_meta + '.tmp'
+    with open(temporal, 'w', encoding='utf-8') as f:
+        json.dump(meta, f)
+    os.replace(temporal, ruta_meta)
+
+
+def version_datos(ruta=RUTA_DATOS):
+    """Identificador del contenido del CSV para las claves de las caches derivadas."""
+    estado = os.stat(ruta)
+    try:
+        with open(_rutas_cache(ruta)[1], encoding='utf-8') as f:
+            meta = json.load(f)
+        if meta.get('mtime_ns') == estado.st_mtime_ns and meta.get('tamano') == estado.st_size:
+            return meta['sha256']
+    except (OSError, ValueError, KeyError):
+        pass
+    return f"{estado.st_size}-{estado.st_mtime_ns}"
+
+
+def cargar_viajes(ruta=RUTA_DATOS, informar=True):
+    """Carga los viajes desde la cache Parquet junto al CSV, regenerándola si el CSV cambió.
+
+    Con `informar=False` no se registra la memoria; lo hace quien une varios ficheros.
+    """
+    ruta_parquet, ruta_meta = _rutas_cache(ruta)
+    estado = os.stat(ruta)
+
+    if os.path.exists(ruta_parquet) and _cache_valida(ruta, ruta_meta, estado):
+        try:
+            df = pd.read_parquet(ruta_parquet)
+            return informar_memoria(df) if informar else df
+        except (OSError, ValueError, ImportError):
+            pass  # Cache corrupta o sin motor Parquet: se vuelve a leer el CSV
+
+    df = leer_csv(ruta)
+    try:
+        temporal = ruta_parquet + '.tmp'
+        df.to_parquet(temporal, index=False)
+        os.replace(temporal, ruta_parquet)
+        _guardar_meta(ruta_meta, estado, _hash_archivo(ruta))
+    except (OSError, ValueError, ImportError):
+        pass  # Sistema de archivos de solo lectura o sin pyarrow: se sigue sin cache
+    return informar_memoria(df) if informar else df
@@ -0,0 +1,45 @@
+import calendar
+
+import numpy as np
+import pandas as pd
+
+from datos import MESES
+
+# Nombres de los días de la semana empezando en lunes
+DIAS_SEMANA = list(calendar.day_name)
+
+
+def _dias(fechas):
+    """Días desde 1970-01-01 de cada fecha, como enteros."""
+    return np.asarray(fechas, dtype='datetime64[D]').astype(np.int64)
+
+
+def conteo_mensual(meses, pesos=None):
+    """Viajes por mes en un array fijo de 12 posiciones; aparecen también los meses vacíos."""
+    conteos = np.bincount(np.asarray(meses, dtype=np.int64) - 1, weights=pesos, minlength=12)
+    return pd.Series(np.rint(conteos).astype(np.int64), index=pd.Index(MESES, name='Mes'))
+
+
+def conteo_diario(fechas, inicio, fin):
+    """Viajes por día entre `inicio` y `fin` (incluidos), con los días vacíos a cero."""
+    primero, ultimo = _dias([inicio, fin])
+    dias = _dias(fechas) - primero
+    conteos = np.bincount(dias, minlength=ultimo - primero + 1)
+    etiquetas = pd.date_range(inicio, fin, freq='D')
+    return pd.Series(conteos, index=etiquetas.strftime('%d-%m-%Y'))
+
+
+def conteo_semanal(fechas, inicio, fin):
+    """Viajes por semana (de lunes a domingo) entre `inicio` y `fin`, etiquetadas por su lunes."""
+    # El 1970-01-01 fue jueves: sumando 3 las semanas empiezan en lunes
+    primera, ultima = (_dias([inicio, fin]) + 3) // 7
+    semanas = (_dias(fechas) + 3) // 7 - primera
+    conteos = np.bincount(semanas, minlength=ultima - primera + 1)
+    lunes = (np.arange(primera, ultima + 1) * 7 - 3).astype('datetime64[D]')
+    return pd.Series(conteos, index=pd.DatetimeIndex(lunes).strftime('%d-%m-%Y'))
+
+
+def conteo_dia_semana(fechas):
+    """Viajes por día de la semana, de lunes a domingo."""
+    conteos = np.bincount((_dias(fechas) + 3) % 7, minlength=7)
+    return pd.Series(conteos, index=pd.Index(DIAS_SEMANA, name='Día de la semana'))
@@ -0,0 +1,150 @@
+"""Exporta las figuras del dashboard a ficheros estáticos para una lista de filtros predefinidos.
+
+Carga los datos una sola vez en el proceso principal y reparte los filtros
+entre un grupo de procesos creados con fork, que heredan el dataframe, el
+índice de filtros y el cubo sin volver a leer el CSV. Por cada filtro escribe
+las figuras de Plotly en JSON y HTML y el mapa por ciudad en HTML.
+
+Con `--particiones` los datos salen de un directorio de CSV por mes y país y
+solo se leen las particiones que puede necesitar alguno de los filtros.
+
+Uso:
+    python exportar.py --presets presets.json --salida exportacion --procesos 4
+    python exportar.py --presets presets.json --particiones data
+"""
+import argparse
+import logging
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from analitica import AlmacenViajes, leer_presets
+from datos import RUTA_DATOS
+from figuras import FIGURAS, mapa_ciudades
+from mapa import renderizar_html
+from particiones import contexto_procesos
+
+FORMATOS = ['json', 'html']
+
+# Datos compartidos con los procesos hijos: con fork se heredan sin copiarlos ni serializarlos
+_ESTADO = {}
+
+
+def alcance_presets(presets):
+    """Países y rango de fechas que cubren entre todos los filtros (`None` si alguno no los limita)."""
+    paises = set()
+    for preset in presets:
+        if 'pais' not in preset:
+            paises = None
+            break
+        paises.update(preset['pais'])
+    inicios = [preset.get('fecha_inicio') for preset in presets]
+    fines = [preset.get('fecha_fin') for preset in presets]
+    rango = (
+        None if None in inicios else min(inicios),
+        None if None in fines else max(fines),
+    )
+    return (None if paises is None else sorted(paises)), (None if rango == (None, None) else rango)
+
+
+def cargar_estado(ruta=RUTA_DATOS, particiones=None, presets=()):
+    """Carga los viajes y construye el índice de filtros y el cubo completo."""
+    if particiones is None:
+        _ESTADO['almacen'] = AlmacenViajes.desde_archivo(ruta)
+    else:
+        paises, rango = alcance_presets(presets)
+        _ESTADO['almacen'] = AlmacenViajes.desde_particiones(particiones, paises, rango)
+
+
+def _nombre_directorio(nombre):
+    return re.sub(r'[^\w.-]+', '_', nombre).strip('_') or 'preset'
+
+
+def construir_figuras(preset):
+    """Las figuras de Plotly y el mapa por ciudad de un filtro, igual que en el dashboard."""
+    consulta = _ESTADO['almacen'].filtrar_preset(preset)
+    if consulta.total_viajes() == 0:
+        return None, None
+    figuras = {nombre: construir(consulta) for nombre, construir in FIGURAS.items()}
+    return figuras, mapa_ciudades(consulta)
+
+
+def exportar_preset(preset, salida, formatos=FORMATOS):
+    """Escribe los ficheros de un filtro en su propio directorio; devuelve un resumen."""
+    inicio = time.perf_counter()
+    directorio = os.path.join(salida, _nombre_directorio(preset['nombre']))
+    figuras, mapa = construir_figuras(preset)
+    if figuras is None:
+        return {'nombre': preset['nombre'], 'ficheros': 0, 'segundos': 0.0, 'vacio': True}
+
+    os.makedirs(directorio, exist_ok=True)
+    ficheros = 0
+    for nombre, fig in figuras.items():
+        if 'json' in formatos:
+            with open(os.path.join(directorio, f'{nombre}.json'), 'w', encoding='utf-8') as f:
+                f.write(fig.to_json())
+            ficheros += 1
+        if 'html' in formatos:
+            fig.write_html(os.path.join(directorio, f'{nombre}.html'), include_plotlyjs='cdn')
+            ficheros += 1
+    with open(os.path.join(directorio, 'mapa.html'), 'w', encoding='utf-8') as f:
+        f.write(renderizar_html(mapa))
+    ficheros += 1
+    return {
+        'nombre': preset['nombre'],
+        'ficheros': ficheros,
+        'segundos': round(time.perf_counter() - inicio, 3),
+        'vacio': False,
+    }
+
+
+def _iniciar_proceso(ruta, particiones, presets):
+    # Sin fork (Windows, macOS por defecto) cada proceso carga los datos desde la cache Parquet
+    if not _ESTADO:
+        cargar_estado(ruta, particiones, presets)
+
+
+def exportar(presets, salida, procesos=None, formatos=FORMATOS, ruta=RUTA_DATOS, particiones=None):
+    """Exporta todos los filtros repartiéndolos entre `procesos` procesos."""
+    cargar_estado(ruta, particiones, presets)
+    if procesos == 1 or len(presets) <= 1:
+        return [exportar_preset(preset, salida, formatos) for preset in presets]
+
+    with ProcessPoolExecutor(
+        max_workers=procesos, mp_context=contexto_procesos(), initializer=_iniciar_proceso, initargs=(ruta, particiones, presets)
+    ) as ejecutor:
+        futuros = [ejecutor.submit(exportar_preset, preset, salida, formatos) for preset in presets]
+        return [futuro.result() for futuro in futuros]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--presets', default='presets.json',
+                        help='Fichero JSON con la lista de filtros a exportar')
+    parser.add_argument('--salida', default='exportacion',
+                        help='Directorio donde se escriben los ficheros')
+    parser.add_argument('--procesos', type=int, default=None,
+                        help='Número de procesos (por defecto, uno por CPU)')
+    parser.add_argument('--formatos', nargs='+', choices=FORMATOS, default=FORMATOS,
+                        help='Formatos de las figuras de Plotly')
+    parser.add_argument('--datos', default=RUTA_DATOS, help='CSV de viajes')
+    parser.add_argument('--particiones', default=None,
+                        help='Directorio con un CSV por mes y país (viajes_AAAA-MM_<pais>.csv) en lugar de --datos')
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(levelname)s %(name)s: %(message)s')
+
+    inicio = time.perf_counter()
+    resumen = exportar(
+        leer_presets(args.presets), args.salida, args.procesos, args.formatos, args.datos, args.particiones
+    )
+    for resultado in resumen:
+        if resultado['vacio']:
+            print(f"{resultado['nombre']:<30} sin viajes, no se exporta")
+        else:
+            print(f"{resultado['nombre']:<30} {resultado['ficheros']:>3} ficheros {resultado['segundos']:>8.3f}s")
+    print(f"{len(resumen)} filtros exportados en {args.salida} ({time.perf_counter() - inicio:.2f}s)")
+
+
+if __name__ == '__main__':
+    main()
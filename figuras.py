@@ -0,0 +1,78 @@
+"""Figuras del dashboard a partir de una `ConsultaViajes`.
+
+Las usan la aplicación, la exportación y el precalentado, de modo que una
+misma consulta produce siempre la misma figura y se puede cachear por nombre.
+"""
+import pandas as pd
+
+from analitica import RESOLUCIONES
+from graficos import (
+    COL_DURACION_DIAS, COL_NUM_VIAJES, figura_duracion, figura_estacional, figura_gasto_alojamiento,
+    figura_media_transporte, figura_reparto_transporte, figura_top_ciudades, figura_valoracion_pais
+)
+from mapa import agregar_por_ciudad, crear_mapa_ciudades
+
+
+def figura_meses(consulta, resolucion="Mensual"):
+    periodo, titulo_periodo = RESOLUCIONES[resolucion]
+    conteos = consulta.estacionalidad(resolucion)
+    viajes_por_mes = pd.DataFrame({'Mes': conteos.index, COL_NUM_VIAJES: conteos.to_numpy()})
+    return figura_estacional(viajes_por_mes, periodo, titulo_periodo)
+
+
+def figura_ciudades(consulta):
+    top_ciudades = consulta.top_ciudades(10).reset_index()
+    top_ciudades.columns = ['Ciudad', COL_NUM_VIAJES]
+    return figura_top_ciudades(top_ciudades)
+
+
+def figura_alojamiento(consulta, precalculado=True):
+    if precalculado:
+        return figura_gasto_alojamiento(None, consulta.estadisticas_caja('tipo_alojamiento', 'gasto_diario'))
+    return figura_gasto_alojamiento(consulta.filas())
+
+
+def figura_valoracion(consulta, precalculado=True):
+    if precalculado:
+        return figura_valoracion_pais(None, consulta.estadisticas_caja('pais', 'valoracion'))
+    return figura_valoracion_pais(consulta.filas())
+
+
+def figura_duracion_ciudades(consulta):
+    duracion_promedio = consulta.duracion_por_ciudad(10).reset_index()
+    duracion_promedio.columns = ['Ciudad', COL_DURACION_DIAS]
+    return figura_duracion(duracion_promedio)
+
+
+def figura_transporte_mensual(consulta):
+    return figura_reparto_transporte(consulta.reparto_transporte_mensual())
+
+
+def figura_gasto_transporte(consulta):
+    gasto = consulta.gasto_por_transporte().reset_index()
+    gasto.columns = ['Transporte', 'Gasto diario medio (€)']
+    return figura_media_transporte(gasto, 'Gasto diario medio por medio de transporte', 'Gasto diario medio (€)', 'Oranges')
+
+
+def figura_valoracion_transporte(consulta):
+    valoracion = consulta.valoracion_por_transporte().reset_index()
+    valoracion.columns = ['Transporte', 'Valoración media']
+    return figura_media_transporte(valoracion, 'Valoración media por medio de transporte', 'Valoración media', 'Purples')
+
+
+def mapa_ciudades(consulta):
+    """Mapa de folium con un marcador por ciudad."""
+    return crear_mapa_ciudades(agregar_por_ciudad(consulta.filas()))
+
+
+# Figuras de Plotly por nombre; los argumentos adicionales de cada una forman parte de su clave de cache
+FIGURAS = {
+    'fig_meses': figura_meses,
+    'fig_ciudades': figura_ciudades,
+    'fig_alojamiento': figura_alojamiento,
+    'fig_valoracion': figura_valoracion,
+    'fig_duracion': figura_duracion_ciudades,
+    'fig_transporte': figura_transporte_mensual,
+    'fig_gasto_transporte': figura_gasto_transporte,
+    'fig_valoracion_transporte': figura_valoracion_transporte,
+}
@@ -0,0 +1,90 @@
+import numpy as np
+import pandas as pd
+
+# Columnas sobre las que se aplican los filtros de la aplicación
+COLUMNAS_FILTRO = ['pais', 'tipo_alojamiento', 'motivo_viaje', 'transporte']
+
+
+def convertir_categorias(df, columnas=COLUMNAS_FILTRO):
+    """Convierte las columnas de filtro a tipo `category`."""
+    for columna in columnas:
+        if not isinstance(df[columna].dtype, pd.CategoricalDtype):
+            df[columna] = df[columna].astype('category')
+    return df
+
+
+class IndiceFiltros:
+    """Índice precalculado de posiciones de fila por cada valor de las columnas de filtro.
+
+    Una selección se resuelve uniendo las posiciones de los valores elegidos en
+    cada columna e intersecando las columnas, sin comparar cadenas fila a fila.
+    Si se indica `columna_fecha`, las filas se ordenan por fecha y un rango de
+    fechas se resuelve con búsqueda binaria como un corte contiguo de filas.
+    """
+
+    def __init__(self, df, columnas=COLUMNAS_FILTRO, columna_fecha=None):
+        if columna_fecha is not None:
+            df = df.sort_values(columna_fecha, kind='stable').reset_index(drop=True)
+            self.fechas = df[columna_fecha].to_numpy().astype('datetime64[ns]')
+        else:
+            self.fechas = None
+        self.df = convertir_categorias(df, columnas)
+        self.n_filas = len(df)
+        self.posiciones = {}
+        for columna in columnas:
+            categorical = self.df[columna].cat
+            codigos = categorical.codes.to_numpy()
+            # Ordenar las filas por código y cortar por los límites de cada categoría
+            orden = np.argsort(codigos, kind='stable')
+            conteos = np.bincount(codigos[codigos >= 0], minlength=len(categorical.categories))
+            limites = np.cumsum(conteos)[:-1]
+            inicio = np.count_nonzero(codigos < 0)  # filas sin valor (código -1)
+            self.posiciones[columna] = dict(
+                zip(categorical.categories, np.split(orden[inicio:], limites))
+            )
+
+    def limites_fechas(self, rango):
+        """Posiciones [inicio, fin) de las filas con fecha dentro del rango (ambos extremos incluidos)."""
+        if rango is None:
+            return 0, self.n_filas
+        inicio, fin = (np.datetime64(pd.Timestamp(extremo), 'ns') for extremo in rango)
+        # El extremo final incluye todo su día
+        fin = fin + np.timedelta64(1, 'D')
+        return (
+            int(np.searchsorted(self.fechas, inicio, side='left')),
+            int(np.searchsorted(self.fechas, fin, side='left')),
+        )
+
+    def mascara(self, selecciones, rango=None):
+        """Máscara booleana de filas para un diccionario {columna: valores seleccionados}.
+
+        `rango` es un par (inicio, fin) de fechas; solo se admite si el índice tiene `columna_fecha`.
+        """
+        mascara = None
+        for columna, valores in selecciones.items():
+            posiciones = self.posiciones[columna]
+            valores = set(valores)
+            # Si están todos los valores seleccionados la columna no filtra nada
+            if valores.issuperset(posiciones):
+                continue
+            mascara_columna = np.zeros(self.n_filas, dtype=bool)
+            for valor in valores:
+                if valor in posiciones:
+                    mascara_columna[posiciones[valor]] = True
+            mascara = mascara_columna if mascara is None else mascara & mascara_columna
+        if mascara is None:
+            mascara = np.ones(self.n_filas, dtype=bool)
+        if rango is not None:
+            inicio, fin = self.limites_fechas(rango)
+            mascara[:inicio] = False
+            mascara[fin:] = False
+        return mascara
+
+    def filtrar(self, selecciones, rango=None):
+        """Devuelve las filas del dataframe que cumplen todas las selecciones y el rango de fechas."""
+        inicio, fin = self.limites_fechas(rango)
+        mascara = self.mascara(selecciones)
+        if mascara.all():
+            # Sin filtros categóricos el rango es un corte directo de las filas ordenadas
+            return self.df if (inicio, fin) == (0, self.n_filas) else self.df.iloc[inicio:fin]
+        return self.df.iloc[inicio + np.flatnonzero(mascara[inicio:fin])]
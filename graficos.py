@@ -0,0 +1,202 @@
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Constantes para evitar duplicados (corrige errores de lint)
+COL_NUM_VIAJES = 'Número de viajes'
+COL_DURACION_DIAS = 'Duración promedio (días)'
+COL_PORCENTAJE_VIAJES = 'Porcentaje de viajes (%)'
+
+# Máximo de valores atípicos por grupo que se envían al navegador
+MAX_ATIPICOS = 50
+
+
+def estadisticas_caja(df, grupo, valor, max_atipicos=MAX_ATIPICOS, semilla=0):
+    """Cuartiles, bigotes (1.5 IQR) y una muestra acotada de atípicos por grupo, con NumPy."""
+    rng = np.random.default_rng(semilla)
+    codigos, grupos = pd.factorize(df[grupo], sort=True)
+    valores = df[valor].to_numpy(dtype=np.float64)
+    # Ordenar una sola vez por grupo y valor para cortar cada grupo ya ordenado
+    orden = np.lexsort((valores, codigos))
+    valores = valores[orden]
+    limites = np.cumsum(np.bincount(codigos, minlength=len(grupos)))[:-1]
+
+    estadisticas = []
+    for nombre, datos in zip(grupos, np.split(valores, limites)):
+        if not len(datos):
+            continue
+        q1, mediana, q3 = np.percentile(datos, [25, 50, 75])
+        iqr = q3 - q1
+        dentro = datos[(datos >= q1 - 1.5 * iqr) & (datos <= q3 + 1.5 * iqr)]
+        atipicos = datos[(datos < q1 - 1.5 * iqr) | (datos > q3 + 1.5 * iqr)]
+        if len(atipicos) > max_atipicos:
+            atipicos = rng.choice(atipicos, max_atipicos, replace=False)
+        estadisticas.append({
+            'grupo': nombre,
+            'q1': q1,
+            'mediana': mediana,
+            'q3': q3,
+            'bigote_inferior': dentro.min(),
+            'bigote_superior': dentro.max(),
+            'atipicos': atipicos,
+            'n': len(datos),
+        })
+    return estadisticas
+
+
+def crear_box_precalculado(estadisticas, titulo, colores):
+    """Diagrama de caja construido a partir de `estadisticas_caja`, de tamaño constante."""
+    fig = go.Figure()
+    for i, caja in enumerate(estadisticas):
+        color = colores[i % len(colores)]
+        fig.add_trace(go.Box(
+            name=caja['grupo'],
+            x=[caja['grupo']],
+            q1=[caja['q1']],
+            median=[caja['mediana']],
+            q3=[caja['q3']],
+            lowerfence=[caja['bigote_inferior']],
+            upperfence=[caja['bigote_superior']],
+            marker_color=color,
+            legendgroup=caja['grupo'],
+            hovertemplate=f"{caja['grupo']} (n={caja['n']})<extra></extra>",
+        ))
+        if len(caja['atipicos']):
+            fig.add_trace(go.Scatter(
+                x=[caja['grupo']] * len(caja['atipicos']),
+                y=caja['atipicos'],
+                mode='markers',
+                marker_color=color,
+                legendgroup=caja['grupo'],
+                showlegend=False,
+                name=caja['grupo'],
+            ))
+    fig.update_layout(title=titulo, boxmode='overlay')
+    return fig
+
+
+def figura_estacional(viajes_por_mes, periodo='mes', titulo_periodo='Mes'):
+    """Barras de viajes por periodo a partir de un dataframe con columnas 'Mes' y COL_NUM_VIAJES."""
+    # Crear gráfico de barras con nuevos colores y mayor contraste
+    fig = px.bar(
+        viajes_por_mes,
+        x='Mes',
+        y=COL_NUM_VIAJES,
+        color=COL_NUM_VIAJES,
+        color_continuous_scale=['#E6EFF6', '#D4E6F1', '#A9CCE3', '#7FB3D5', '#5499C7', '#2980B9', '#1A5276'],
+        title=f'Número de viajes por {periodo}'
+    )
+    fig.update_layout(
+        xaxis_title=titulo_periodo,
+        yaxis_title=COL_NUM_VIAJES,
+        coloraxis_colorbar=dict(title=COL_NUM_VIAJES),
+        plot_bgcolor='white'
+    )
+    return fig
+
+
+def figura_top_ciudades(top_ciudades):
+    """Barras horizontales de las ciudades más visitadas (columnas 'Ciudad' y COL_NUM_VIAJES)."""
+    fig = px.bar(
+        top_ciudades,
+        y='Ciudad',
+        x=COL_NUM_VIAJES,
+        color=COL_NUM_VIAJES,
+        color_continuous_scale='Reds',
+        orientation='h',
+        title='Top 10 ciudades más visitadas'
+    )
+    fig.update_layout(yaxis_title='Ciudad', xaxis_title=COL_NUM_VIAJES)
+    return fig
+
+
+def figura_gasto_alojamiento(df_filtrado, estadisticas=None):
+    """Caja del gasto diario por alojamiento; con `estadisticas` se usa la versión precalculada."""
+    if estadisticas is not None:
+        fig = crear_box_precalculado(
+            estadisticas,
+            titulo='Gasto diario por tipo de alojamiento',
+            colores=px.colors.qualitative.Pastel
+        )
+    else:
+        fig = px.box(
+            df_filtrado,
+            x='tipo_alojamiento',
+            y='gasto_diario',
+            color='tipo_alojamiento',
+            color_discrete_sequence=px.colors.qualitative.Pastel,
+            title='Gasto diario por tipo de alojamiento'
+        )
+    fig.update_layout(xaxis_title='Tipo de alojamiento', yaxis_title='Gasto diario (€)')
+    return fig
+
+
+def figura_valoracion_pais(df_filtrado, estadisticas=None):
+    """Caja de la valoración por país; con `estadisticas` se usa la versión precalculada."""
+    if estadisticas is not None:
+        fig = crear_box_precalculado(
+            estadisticas,
+            titulo='Valoración por país (1-5)',
+            colores=px.colors.qualitative.Bold
+        )
+    else:
+        fig = px.box(
+            df_filtrado,
+            x='pais',
+            y='valoracion',
+            color='pais',
+            color_discrete_sequence=px.colors.qualitative.Bold,
+            title='Valoración por país (1-5)'
+        )
+    fig.update_layout(xaxis_title='País', yaxis_title='Valoración')
+    return fig
+
+
+def figura_duracion(duracion_promedio):
+    """Barras de las ciudades con mayor duración media (columnas 'Ciudad' y COL_DURACION_DIAS)."""
+    fig = px.bar(
+        duracion_promedio,
+        x='Ciudad',
+        y=COL_DURACION_DIAS,
+        color=COL_DURACION_DIAS,
+        color_continuous_scale='Greens',
+        title='Top 10 ciudades con mayor duración de estancia'
+    )
+    fig.update_layout(xaxis_title='Ciudad', yaxis_title=COL_DURACION_DIAS)
+    return fig
+
+
+def figura_reparto_transporte(reparto):
+    """Barras apiladas al 100 % con el peso de cada medio de transporte en cada mes."""
+    datos = reparto.reset_index().melt(id_vars='Mes', var_name='Transporte', value_name=COL_PORCENTAJE_VIAJES)
+    fig = px.bar(
+        datos,
+        x='Mes',
+        y=COL_PORCENTAJE_VIAJES,
+        color='Transporte',
+        color_discrete_sequence=px.colors.qualitative.Set2,
+        title='Reparto de los viajes por medio de transporte y mes'
+    )
+    fig.update_layout(
+        barmode='stack',
+        xaxis_title='Mes',
+        yaxis_title=COL_PORCENTAJE_VIAJES,
+        yaxis_range=[0, 100],
+        plot_bgcolor='white'
+    )
+    return fig
+
+
+def figura_media_transporte(medias, titulo, eje_y, escala):
+    """Barras de una media por medio de transporte (columnas 'Transporte' y `eje_y`)."""
+    fig = px.bar(
+        medias,
+        x='Transporte',
+        y=eje_y,
+        color=eje_y,
+        color_continuous_scale=escala,
+        title=titulo
+    )
+    fig.update_layout(xaxis_title='Medio de transporte', yaxis_title=eje_y)
+    return fig
@@ -0,0 +1,141 @@
+import numpy as np
+import pandas as pd
+
+from cubo import DIMENSIONES, MEDIDAS, PARES
+from topk import top_serie
+
+# Tras este número de actualizaciones parciales se recalcula todo para evitar deriva numérica
+MAX_ACTUALIZACIONES = 50
+
+
+class AgregadosIncrementales:
+    """Agregados por dimensión de la selección actual, actualizados por diferencias.
+
+    Se construye sobre el índice del cubo (`IndiceFiltros` de `construir_cubo`).
+    Cuando solo cambia un filtro, suma o resta únicamente las celdas del cubo de
+    los valores añadidos o quitados, en lugar de recorrer todo el cubo.
+    """
+
+    def __init__(self, indice_cubo, selecciones, dimensiones=DIMENSIONES, medidas=MEDIDAS, pares=PARES):
+        self.indice = indice_cubo
+        cubo = indice_cubo.df
+        self.codigos = {}
+        self.etiquetas = {}
+        for dimension in dimensiones:
+            columna = cubo[dimension]
+            if isinstance(columna.dtype, pd.CategoricalDtype):
+                self.codigos[dimension] = columna.cat.codes.to_numpy()
+                self.etiquetas[dimension] = columna.cat.categories
+            else:
+                self.codigos[dimension], self.etiquetas[dimension] = pd.factorize(columna, sort=True)
+        self.valores = {'viajes': cubo['viajes'].to_numpy(dtype=np.float64)}
+        for medida in medidas:
+            self.valores[f'suma_{medida}'] = cubo[f'suma_{medida}'].to_numpy(dtype=np.float64)
+        self.pares = list(pares)
+        self._recalcular(selecciones)
+
+    def _recalcular(self, selecciones):
+        self.selecciones = {columna: set(valores) for columna, valores in selecciones.items()}
+        self.totales = {
+            dimension: {clave: np.zeros(len(etiquetas)) for clave in self.valores}
+            for dimension, etiquetas in self.etiquetas.items()
+        }
+        # Viajes por combinación de valores de cada par, como matriz aplanada
+        self.cruzados = {
+            (a, b): np.zeros(len(self.etiquetas[a]) * len(self.etiquetas[b])) for a, b in self.pares
+        }
+        self.actualizaciones = 0
+        self._acumular(np.flatnonzero(self.indice.mascara(selecciones)), 1)
+
+    def _acumular(self, filas, signo):
+        if not len(filas):
+            return
+        for dimension, totales in self.totales.items():
+            codigos = self.codigos[dimension][filas]
+            for clave, valores in self.valores.items():
+                totales[clave] += signo * np.bincount(
+                    codigos, weights=valores[filas], minlength=len(self.etiquetas[dimension])
+                )
+        for (a, b), cruzados in self.cruzados.items():
+            codigos = self.codigos[a][filas] * len(self.etiquetas[b]) + self.codigos[b][filas]
+            cruzados += signo * np.bincount(codigos, weights=self.valores['viajes'][filas], minlength=cruzados.size)
+
+    def _filas(self, columna, valores, otras_selecciones):
+        """Celdas del cubo con alguno de los valores de la columna que cumplen el resto de filtros."""
+        posiciones = self.indice.posiciones[columna]
+        partes = [posiciones[valor] for valor in valores if valor in posiciones]
+        if not partes:
+            return np.empty(0, dtype=np.intp)
+        filas = np.concatenate(partes)
+        for otra, seleccion in otras_selecciones.items():
+            permitidos = np.array([etiqueta in seleccion for etiqueta in self.etiquetas[otra]], dtype=bool)
+            filas = filas[permitidos[self.codigos[otra][filas]]]
+        return filas
+
+    def actualizar(self, selecciones):
+        nuevas = {columna: set(valores) for columna, valores in selecciones.items()}
+        cambiadas = [columna for columna in nuevas if nuevas[columna] != self.selecciones.get(columna)]
+        if not cambiadas:
+            return self
+        if len(cambiadas) > 1 or self.actualizaciones >= MAX_ACTUALIZACIONES:
+            self._recalcular(selecciones)
+            return self
+
+        columna = cambiadas[0]
+        otras = {otra: valores for otra, valores in nuevas.items() if otra != columna}
+        anadidas = self._filas(columna, nuevas[columna] - self.selecciones[columna], otras)
+        quitadas = self._filas(columna, self.selecciones[columna] - nuevas[columna], otras)
+        self._acumular(anadidas, 1)
+        self._acumular(quitadas, -1)
+        self.selecciones = nuevas
+        self.actualizaciones += 1
+        return self
+
+    def _serie(self, dimension, valores, viajes):
+        serie = pd.Series(valores, index=pd.Index(self.etiquetas[dimension], name=dimension))
+        return serie[viajes > 0.5]
+
+    def total_viajes(self):
+        dimension = next(iter(self.totales))
+        return int(round(self.totales[dimension]['viajes'].sum()))
+
+    def conteo_por(self, dimension):
+        """Número de viajes por valor de la dimensión, de mayor a menor."""
+        viajes = self.totales[dimension]['viajes']
+        conteos = self._serie(dimension, np.rint(viajes).astype(np.int64), viajes)
+        return conteos.sort_values(ascending=False)
+
+    def media_por(self, dimension, medida):
+        """Media de la medida por valor de la dimensión, de mayor a menor."""
+        totales = self.totales[dimension]
+        viajes = totales['viajes']
+        with np.errstate(invalid='ignore', divide='ignore'):
+            medias = totales[f'suma_{medida}'] / viajes
+        return self._serie(dimension, medias, viajes).sort_values(ascending=False)
+
+    def conteo_cruzado(self, a, b):
+        """Viajes por combinación de valores de un par de `PARES`: filas de `a` y columnas de `b`."""
+        conteos = np.rint(self.cruzados[(a, b)]).astype(np.int64)
+        return pd.DataFrame(
+            conteos.reshape(len(self.etiquetas[a]), len(self.etiquetas[b])),
+            index=pd.Index(self.etiquetas[a], name=a),
+            columns=pd.Index(self.etiquetas[b], name=b),
+        )
+
+    def top_conteo(self, dimension, k):
+        """Los `k` valores con más viajes, sin ordenar toda la dimensión."""
+        viajes = self.totales[dimension]['viajes']
+        presentes = np.flatnonzero(viajes > 0.5)
+        conteos = np.rint(viajes[presentes]).astype(np.int64)
+        return top_serie(conteos, self.etiquetas[dimension][presentes], k, nombre=dimension)
+
+    def top_media(self, dimension, medida, k):
+        """Los `k` valores con mayor media de la medida, sin ordenar toda la dimensión."""
+        totales = self.totales[dimension]
+        presentes = np.flatnonzero(totales['viajes'] > 0.5)
+        medias = totales[f'suma_{medida}'][presentes] / totales['viajes'][presentes]
+        return top_serie(medias, self.etiquetas[dimension][presentes], k, nombre=dimension)
+
+    def media_global(self, medida):
+        totales = next(iter(self.totales.values()))
+        return totales[f'suma_{medida}'].sum() / totales['viajes'].sum()
@@ -0,0 +1,108 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from cubo import combinar_cubos, construir_cubo
+from datos import aplicar_esquema, enriquecer
+from topk import CAPACIDAD_FRECUENTES, FrecuentesMisraGries
+
+# Tipos fijos de las columnas del CSV para leer cada bloque sin inferencia
+TIPOS_CSV = {
+    'fecha': 'str',
+    'pais': 'str',
+    'ciudad': 'str',
+    'latitud': 'float32',
+    'longitud': 'float32',
+    'tipo_alojamiento': 'str',
+    'duracion_estancia': 'int16',
+    'gasto_diario': 'float64',
+    'valoracion': 'int8',
+    'transporte': 'str',
+    'motivo_viaje': 'str',
+}
+
+TAMANO_BLOQUE = 250_000
+TAMANO_MUESTRA = 20_000
+
+# A partir de este tamaño de CSV la aplicación usa la ingesta por bloques
+UMBRAL_STREAMING_MB = float(os.environ.get('TURISMO_UMBRAL_STREAMING_MB', 500))
+
+
+def _lista_rutas(rutas):
+    return [rutas] if isinstance(rutas, str) else list(rutas)
+
+
+def usar_streaming(rutas, umbral_mb=UMBRAL_STREAMING_MB):
+    """Si el CSV, o el conjunto de CSV de una lista de rutas, supera el umbral."""
+    return sum(os.path.getsize(ruta) for ruta in _lista_rutas(rutas)) > umbral_mb * 1024 * 1024
+
+
+class IngestaStreaming:
+    """Acumula el cubo de agregación y una muestra reservorio acotada a partir de bloques de viajes.
+
+    La memoria depende del número de combinaciones del cubo y del tamaño de la
+    muestra, no del número de filas leídas. Con `capacidad_frecuentes` se
+    mantiene además un resumen Misra-Gries de las ciudades más frecuentes.
+    """
+
+    def __init__(self, tamano_muestra=TAMANO_MUESTRA, semilla=0, capacidad_frecuentes=CAPACIDAD_FRECUENTES):
+        self.tamano_muestra = tamano_muestra
+        self.rng = np.random.default_rng(semilla)
+        self.filas = 0
+        self.cubo = None
+        self._muestra = None
+        self.frecuentes = FrecuentesMisraGries(capacidad_frecuentes) if capacidad_frecuentes else None
+
+    def procesar(self, bloque):
+        bloque = enriquecer(bloque.reset_index(drop=True))
+        cubo_bloque = construir_cubo(bloque)
+        self.cubo = cubo_bloque if self.cubo is None else combinar_cubos(self.cubo, cubo_bloque)
+        self._actualizar_muestra(bloque)
+        if self.frecuentes is not None:
+            self.frecuentes.actualizar(bloque['ciudad'])
+        self.filas += len(bloque)
+
+    def _actualizar_muestra(self, bloque):
+        # Algoritmo R vectorizado: la fila global i sustituye la posición j ~ U[0, i] si j < k
+        k = self.tamano_muestra
+        if self._muestra is None:
+            self._muestra = bloque.iloc[:k].copy()
+            inicio = min(k, len(bloque))
+        else:
+            inicio = 0
+        faltan = k - len(self._muestra)
+        if faltan > 0 and inicio == 0:
+            self._muestra = pd.concat([self._muestra, bloque.iloc[:faltan]], ignore_index=True)
+            inicio = min(faltan, len(bloque))
+        if inicio >= len(bloque):
+            return
+        indices_globales = self.filas + np.arange(inicio, len(bloque))
+        posiciones = self.rng.integers(0, indices_globales + 1)
+        elegidas = np.flatnonzero(posiciones < k)
+        if not len(elegidas):
+            return
+        # Si dos filas caen en la misma posición gana la última, como en el algoritmo secuencial
+        destino = posiciones[elegidas][::-1]
+        destino, primera = np.unique(destino, return_index=True)
+        origen = inicio + elegidas[::-1][primera]
+        self._muestra = pd.concat(
+            [self._muestra.drop(index=destino), bloque.iloc[origen]],
+            ignore_index=True
+        )
+
+    @property
+    def muestra(self):
+        if self._muestra is None:
+            return None
+        return aplicar_esquema(self._muestra.reset_index(drop=True))
+
+
+def leer_por_bloques(rutas, tamano_bloque=TAMANO_BLOQUE, tamano_muestra=TAMANO_MUESTRA,
+                    capacidad_frecuentes=CAPACIDAD_FRECUENTES):
+    """Lee uno o varios CSV por bloques con tipos fijos y devuelve la ingesta acumulada."""
+    ingesta = IngestaStreaming(tamano_muestra, capacidad_frecuentes=capacidad_frecuentes)
+    for ruta in _lista_rutas(rutas):
+        for bloque in pd.read_csv(ruta, dtype=TIPOS_CSV, chunksize=tamano_bloque):
+            ingesta.procesar(bloque)
+    return ingesta
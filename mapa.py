@@ -0,0 +1,201 @@
+import os
+
+import folium
+import numpy as np
+import plotly.graph_objects as go
+
+# Diccionario de colores por país
+COLORES_PAISES = {
+    'España': 'red',
+    'Francia': 'blue',
+    'Italia': 'green',
+    'Alemania': 'purple',
+    'Reino Unido': 'orange'
+}
+
+UBICACION_INICIAL = [48.8566, 2.3522]
+ANCHO_MAPA = 700
+ALTO_MAPA = 500
+COLUMNAS_UBICACION = ['pais', 'ciudad', 'latitud', 'longitud']
+
+# A partir de este número de viajes el mapa por viaje se dibuja con WebGL (Plotly) en lugar de folium
+UMBRAL_MAPA_WEBGL = int(os.environ.get('TURISMO_UMBRAL_MAPA_WEBGL', 2000))
+
+
+def agregar_por_ciudad(df):
+    """Agrupa los viajes por ubicación en una sola pasada vectorizada."""
+    return (
+        df.groupby(COLUMNAS_UBICACION, observed=True, sort=False)
+        .agg(
+            viajes=('duracion_estancia', 'size'),
+            duracion_media=('duracion_estancia', 'mean'),
+            gasto_medio=('gasto_diario', 'mean'),
+            valoracion_media=('valoracion', 'mean'),
+        )
+        .reset_index()
+    )
+
+
+def _agregar_leyenda(m, texto_tamano):
+    legend_html = """
+    <div style="position: fixed; bottom: 50px; left: 50px; z-index: 1000; background-color: white; padding: 10px; border: 1px solid grey; border-radius: 5px;">
+    <p><b>Países:</b></p>
+    """
+
+    for pais, color in COLORES_PAISES.items():
+        legend_html += f"""
+        <p><i class="fa fa-circle" style="color:{color}"></i> {pais}</p>
+        """
+
+    legend_html += f"""
+    <p><b>Tamaño:</b> {texto_tamano}</p>
+    </div>
+    """
+
+    m.get_root().html.add_child(folium.Element(legend_html))
+
+
+def crear_mapa_ciudades(df_ciudades):
+    """Mapa con un marcador por ciudad a partir de `agregar_por_ciudad`."""
+    m = folium.Map(location=UBICACION_INICIAL, zoom_start=4)
+
+    for ciudad in df_ciudades.itertuples(index=False):
+        color = COLORES_PAISES.get(ciudad.pais, 'gray')
+        folium.CircleMarker(
+            location=[ciudad.latitud, ciudad.longitud],
+            radius=ciudad.duracion_media / 3,  # Tamaño proporcional a la duración media
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.7,
+            popup=f"""
+            <b>{ciudad.ciudad}, {ciudad.pais}</b><br>
+            Viajes: {ciudad.viajes}<br>
+            Duración media: {ciudad.duracion_media:.1f} días<br>
+            Gasto diario medio: {ciudad.gasto_medio:.2f}€<br>
+            Valoración media: {ciudad.valoracion_media:.2f}/5
+            """
+        ).add_to(m)
+
+    _agregar_leyenda(m, "Duración media de la estancia")
+    return m
+
+
+def construir_popups(df):
+    """Genera el HTML del popup de todos los viajes en una pasada por columnas."""
+    def texto(columna):
+        return df[columna].astype(str)
+
+    return (
+        '<b>' + texto('ciudad') + ', ' + texto('pais') + '</b><br>'
+        + 'Fecha: ' + df['fecha'].dt.strftime('%d-%m-%Y') + '<br>'
+        + 'Alojamiento: ' + texto('tipo_alojamiento') + '<br>'
+        + 'Duración: ' + texto('duracion_estancia') + ' días<br>'
+        + 'Gasto diario: ' + texto('gasto_diario') + '€<br>'
+        + 'Valoración: ' + texto('valoracion') + '/5<br>'
+        + 'Motivo: ' + texto('motivo_viaje')
+    ).astype(object)
+
+
+def crear_mapa_viajes(df):
+    """Mapa con un marcador por viaje, pensado para el detalle de una ciudad."""
+    if len(df):
+        ubicacion = [df['latitud'].iloc[0], df['longitud'].iloc[0]]
+        zoom = 11
+    else:
+        ubicacion, zoom = UBICACION_INICIAL, 4
+    m = folium.Map(location=ubicacion, zoom_start=zoom)
+
+    popups = df['popup'] if 'popup' in df.columns else construir_popups(df)
+    colores = df['pais'].map(COLORES_PAISES).astype(object).fillna('gray')
+    for latitud, longitud, duracion, color, popup in zip(
+        df['latitud'].to_numpy(), df['longitud'].to_numpy(), df['duracion_estancia'].to_numpy(),
+        colores.to_numpy(), popups.to_numpy()
+    ):
+        folium.CircleMarker(
+            location=[latitud, longitud],
+            radius=duracion / 3,  # Tamaño proporcional a la duración
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.7,
+            popup=popup
+        ).add_to(m)
+
+    _agregar_leyenda(m, "Duración de la estancia")
+    return m
+
+
+def crear_mapa_clusters(clusters, zoom):
+    """Mapa con un nodo por cluster de viajes; el tamaño crece con el número de viajes."""
+    m = folium.Map(location=UBICACION_INICIAL, zoom_start=zoom)
+
+    for cluster in clusters.itertuples(index=False):
+        color = COLORES_PAISES.get(cluster.pais, 'gray')
+        folium.CircleMarker(
+            location=[cluster.latitud, cluster.longitud],
+            radius=6 + 2 * np.log2(cluster.viajes),
+            color=color,
+            fill=True,
+            fill_color=color,
+            fill_opacity=0.6,
+            tooltip=folium.Tooltip(f"{cluster.viajes}", permanent=True),
+            popup=f"""
+            <b>{cluster.viajes} viajes</b><br>
+            Ciudades: {cluster.ciudades}<br>
+            País predominante: {cluster.pais}<br>
+            Duración media: {cluster.duracion_media:.1f} días
+            """
+        ).add_to(m)
+
+    _agregar_leyenda(m, "Número de viajes del grupo")
+    return m
+
+def renderizar_html(m):
+    """Serializa el mapa en el HTML que `folium_static` envía al navegador."""
+    return folium.Figure().add_child(m).render()
+
+
+def usar_mapa_webgl(df, umbral=UMBRAL_MAPA_WEBGL):
+    return len(df) > umbral
+
+
+def crear_mapa_plotly(df):
+    """Mapa por viaje con una capa vectorizada por país (Scattermap, WebGL)."""
+    fig = go.Figure()
+    datos_hover = df[['ciudad', 'pais', 'tipo_alojamiento', 'duracion_estancia',
+                      'gasto_diario', 'valoracion', 'motivo_viaje']].astype(object)
+    datos_hover.insert(2, 'fecha', df['fecha'].dt.strftime('%d-%m-%Y'))
+    # Los países sin color propio se dibujan en gris, como en el mapa folium
+    otros = sorted(set(df['pais'].dropna().unique()) - set(COLORES_PAISES))
+    for pais in list(COLORES_PAISES) + otros:
+        seleccion = (df['pais'] == pais).to_numpy()
+        if not seleccion.any():
+            continue
+        color = COLORES_PAISES.get(pais, 'gray')
+        fig.add_trace(go.Scattermap(
+            lat=df['latitud'].to_numpy()[seleccion],
+            lon=df['longitud'].to_numpy()[seleccion],
+            mode='markers',
+            name=pais,
+            # Plotly usa el diámetro y folium el radio: mismo tamaño visual que en el mapa folium
+            marker=dict(size=df['duracion_estancia'].to_numpy()[seleccion] / 3 * 2, color=color, opacity=0.7),
+            customdata=datos_hover.to_numpy()[seleccion],
+            hovertemplate=(
+                "<b>%{customdata[0]}, %{customdata[1]}</b><br>"
+                "Fecha: %{customdata[2]}<br>"
+                "Alojamiento: %{customdata[3]}<br>"
+                "Duración: %{customdata[4]} días<br>"
+                "Gasto diario: %{customdata[5]}€<br>"
+                "Valoración: %{customdata[6]}/5<br>"
+                "Motivo: %{customdata[7]}<extra></extra>"
+            ),
+        ))
+    fig.update_layout(
+        map=dict(style='open-street-map', center=dict(lat=UBICACION_INICIAL[0], lon=UBICACION_INICIAL[1]), zoom=3),
+        width=ANCHO_MAPA,
+        height=ALTO_MAPA,
+        margin=dict(l=0, r=0, t=0, b=0),
+        legend_title_text='Países',
+    )
+    return fig
@@ -0,0 +1,216 @@
+"""Conjunto de viajes repartido en un fichero CSV por mes y país.
+
+Los ficheros se descubren por su nombre, `viajes_AAAA-MM_<pais>.csv`, y se
+leen en paralelo en un grupo de procesos, cada uno con su cache Parquet. Un
+manifiesto guarda por partición sus fechas mínima y máxima y sus países, de
+modo que un filtro por país o por fechas solo lee las particiones que pueden
+contener viajes que lo cumplan. Solo se vuelven a leer las particiones cuyo
+fichero cambió desde la última vez.
+
+Los procesos se crean con fork, que solo es seguro desde un proceso de un
+hilo (los CLI). El servidor de Streamlit tiene muchos hilos y, con spawn o
+forkserver, cada proceso volvería a ejecutar el script de la aplicación, que
+Streamlit instala como `__main__`; por eso la aplicación usa `subproceso=True`
+y la lectura en paralelo se hace en un proceso aparte:
+
+    python -m particiones data --procesos 4
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import re
+import subprocess
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from datos import aplicar_esquema, cargar_viajes, informar_memoria, memoria, version_datos
+
+# Directorio donde se buscan las particiones
+DIRECTORIO_PARTICIONES = os.environ.get('TURISMO_PARTICIONES', 'data')
+
+# Convención de nombres: un fichero por mes y país, por ejemplo viajes_2024-03_espana.csv
+PATRON_PARTICION = re.compile(r'^viajes_(\d{4})-(\d{2})_[^.]+\.csv$')
+
+ARCHIVO_MANIFIESTO = 'manifiesto_particiones.json'
+
+# Se incrementa cuando cambia el formato del manifiesto
+VERSION_MANIFIESTO = 1
+
+
+def descubrir_particiones(directorio=DIRECTORIO_PARTICIONES):
+    """Rutas de los ficheros del directorio que siguen la convención de nombres, ordenadas."""
+    try:
+        nombres = os.listdir(directorio)
+    except OSError:
+        return []
+    return [os.path.join(directorio, nombre) for nombre in sorted(nombres) if PATRON_PARTICION.match(nombre)]
+
+
+def version_particiones(rutas):
+    """Identificador del contenido de un conjunto de particiones para las caches derivadas."""
+    sha = hashlib.sha256()
+    for ruta in rutas:
+        sha.update(f"{os.path.basename(ruta)}:{version_datos(ruta)}\n".encode())
+    return sha.hexdigest()
+
+
+def _cargar_particion(ruta):
+    # La memoria se registra una sola vez para el conjunto, no por partición
+    return cargar_viajes(ruta, informar=False)
+
+
+def _resumir_particion(ruta):
+    # Al leerla se genera también su cache Parquet, que reutiliza la carga posterior
+    df = _cargar_particion(ruta)
+    return {
+        'filas': len(df),
+        'fecha_minima': df['fecha'].min().date().isoformat() if len(df) else None,
+        'fecha_maxima': df['fecha'].max().date().isoformat() if len(df) else None,
+        'paises': sorted(df['pais'].dropna().unique().tolist()),
+    }
+
+
+def contexto_procesos():
+    """Contexto de multiprocessing para los grupos de procesos de los CLI: fork si existe, si no spawn."""
+    # Sin fork (Windows) los procesos importan el módulo principal, protegido con __main__ en los CLI
+    metodos = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context('fork' if 'fork' in metodos else 'spawn')
+
+
+def _en_paralelo(funcion, rutas, procesos=None):
+    """Resultados de `funcion` sobre cada ruta, en el mismo orden, repartidos entre procesos."""
+    if procesos == 1 or len(rutas) <= 1:
+        return [funcion(ruta) for ruta in rutas]
+    with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto_procesos()) as ejecutor:
+        return list(ejecutor.map(funcion, rutas))
+
+
+def _se_solapan(particion, paises, rango):
+    if particion['filas'] == 0:
+        return False
+    if paises is not None and not set(particion['paises']) & set(paises):
+        return False
+    if rango is not None:
+        inicio, fin = rango
+        if inicio is not None and particion['fecha_maxima'] < pd.Timestamp(inicio).date().isoformat():
+            return False
+        if fin is not None and particion['fecha_minima'] > pd.Timestamp(fin).date().isoformat():
+            return False
+    return True
+
+
+class DatasetParticionado:
+    """Particiones de un directorio con su manifiesto de fechas y países.
+
+    Con `subproceso=True` no se crean procesos desde el proceso actual: las
+    particiones nuevas se leen en paralelo en `python -m particiones` y después
+    se cargan de sus caches Parquet.
+    """
+
+    def __init__(self, directorio=DIRECTORIO_PARTICIONES, procesos=None, subproceso=False):
+        self.directorio = directorio
+        self.procesos = procesos
+        self.subproceso = subproceso
+        self.ruta_manifiesto = os.path.join(directorio, ARCHIVO_MANIFIESTO)
+        self.particiones = self.actualizar_manifiesto()
+
+    def _leer_manifiesto(self):
+        try:
+            with open(self.ruta_manifiesto, encoding='utf-8') as f:
+                manifiesto = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if manifiesto.get('version') != VERSION_MANIFIESTO:
+            return {}
+        return {particion['archivo']: particion for particion in manifiesto.get('particiones', [])}
+
+    def _comparar(self, anteriores):
+        """Entradas de las particiones actuales y, entre ellas, las nuevas o modificadas."""
+        particiones, pendientes = [], []
+        for ruta in descubrir_particiones(self.directorio):
+            estado = os.stat(ruta)
+            particion = anteriores.get(os.path.basename(ruta))
+            if particion is None or (particion['mtime_ns'], particion['tamano']) != (estado.st_mtime_ns, estado.st_size):
+                particion = {'archivo': os.path.basename(ruta), 'mtime_ns': estado.st_mtime_ns, 'tamano': estado.st_size}
+                pendientes.append(particion)
+            particiones.append(particion)
+        return particiones, pendientes
+
+    def _procesos_locales(self):
+        return 1 if self.subproceso else self.procesos
+
+    def actualizar_manifiesto(self):
+        """Entradas del manifiesto de todas las particiones; se leen solo las nuevas o modificadas."""
+        anteriores = self._leer_manifiesto()
+        particiones, pendientes = self._comparar(anteriores)
+        if self.subproceso and len(pendientes) > 1:
+            argumentos = [sys.executable, '-m', 'particiones', os.path.abspath(self.directorio)]
+            if self.procesos:
+                argumentos += ['--procesos', str(self.procesos)]
+            subprocess.run(argumentos, check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+            # Lo que el otro proceso no pudo guardar (disco de solo lectura) se lee aquí, en serie
+            anteriores = self._leer_manifiesto()
+            particiones, pendientes = self._comparar(anteriores)
+
+        if pendientes:
+            rutas = [os.path.join(self.directorio, particion['archivo']) for particion in pendientes]
+            for particion, resumen in zip(pendientes, _en_paralelo(_resumir_particion, rutas, self._procesos_locales())):
+                particion.update(resumen)
+        if pendientes or len(particiones) != len(anteriores):
+            self._guardar_manifiesto(particiones)
+        return particiones
+
+    def _guardar_manifiesto(self, particiones):
+        try:
+            temporal = self.ruta_manifiesto + '.tmp'
+            with open(temporal, 'w', encoding='utf-8') as f:
+                json.dump({'version': VERSION_MANIFIESTO, 'particiones': particiones}, f, ensure_ascii=False, indent=1)
+            os.replace(temporal, self.ruta_manifiesto)
+        except OSError:
+            pass  # Sistema de archivos de solo lectura: el manifiesto se recalcula en cada carga
+
+    def rutas(self, paises=None, rango=None):
+        """Particiones que pueden tener viajes de alguno de los `paises` dentro del `rango` de fechas.
+
+        `None` no filtra; cualquiera de los extremos del rango puede ser `None`.
+        """
+        return [
+            os.path.join(self.directorio, particion['archivo'])
+            for particion in self.particiones if _se_solapan(particion, paises, rango)
+        ]
+
+    def cargar(self, paises=None, rango=None):
+        """Viajes de las particiones seleccionadas con `rutas`, leídas en paralelo.
+
+        Se descartan particiones completas: las filas de otros países o fechas
+        que compartan partición con las pedidas se filtran después.
+        """
+        rutas = self.rutas(paises, rango)
+        if not rutas:
+            raise ValueError(f"Ninguna partición de {self.directorio} tiene viajes para el filtro indicado")
+        partes = _en_paralelo(_cargar_particion, rutas, self._procesos_locales())
+        # Cada partición tiene sus propias categorías: se unen y se vuelve a aplicar el esquema
+        df = aplicar_esquema(pd.concat(partes, ignore_index=True))
+        informes = [parte.attrs.get('memoria') for parte in partes]
+        if all(informes):
+            df.attrs['memoria'] = {'antes': sum(informe['antes'] for informe in informes), 'despues': memoria(df)}
+        return informar_memoria(df)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Actualiza el manifiesto y las caches Parquet de las particiones')
+    parser.add_argument('directorio', nargs='?', default=DIRECTORIO_PARTICIONES,
+                        help='Directorio con un CSV por mes y país (viajes_AAAA-MM_<pais>.csv)')
+    parser.add_argument('--procesos', type=int, default=None,
+                        help='Número de procesos (por defecto, uno por CPU)')
+    args = parser.parse_args(argv)
+    particiones = DatasetParticionado(args.directorio, args.procesos).particiones
+    print(f"{len(particiones)} particiones en {args.directorio}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+import json
+import logging
+import threading
+import time
+import tracemalloc
+from collections import defaultdict, deque
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+# Número de ejecuciones recientes por etapa usadas para los percentiles
+VENTANA_HISTORIAL = 200
+
+
+class HistorialEtapas:
+    """Duraciones recientes de cada etapa, compartidas entre ejecuciones del script."""
+
+    def __init__(self, ventana=VENTANA_HISTORIAL):
+        self._duraciones = defaultdict(lambda: deque(maxlen=ventana))
+        self._lock = threading.Lock()
+
+    def registrar(self, etapa, segundos):
+        with self._lock:
+            self._duraciones[etapa].append(segundos)
+
+    def percentiles(self, etapa):
+        with self._lock:
+            duraciones = np.array(self._duraciones[etapa])
+        if not len(duraciones):
+            return None, None
+        return np.percentile(duraciones, 50), np.percentile(duraciones, 95)
+
+
+class Perfilador:
+    """Mide tiempo, memoria asignada y tamaño de payload de cada etapa de una ejecución.
+
+    Si no está activo, `etapa` y `payload` no hacen nada para no penalizar las
+    ejecuciones normales. La memoria solo se mide con `medir_memoria`:
+    tracemalloc afecta a todo el proceso (ralentiza todas las sesiones y el pico
+    es compartido), así que lo decide quien arranca el servidor y no cada visita.
+    """
+
+    def __init__(self, activo, historial, medir_memoria=False):
+        self.activo = activo
+        self.historial = historial
+        self.etapas = []
+        self.medir_memoria = activo and medir_memoria
+        if self.medir_memoria and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    @contextmanager
+    def etapa(self, nombre):
+        if not self.activo:
+            yield
+            return
+        if self.medir_memoria:
+            tracemalloc.reset_peak()
+            memoria_inicial, _ = tracemalloc.get_traced_memory()
+        inicio = time.perf_counter()
+        try:
+            yield
+        finally:
+            segundos = time.perf_counter() - inicio
+            memoria_pico = None
+            if self.medir_memoria:
+                _, pico = tracemalloc.get_traced_memory()
+                memoria_pico = max(pico - memoria_inicial, 0)
+            self.historial.registrar(nombre, segundos)
+            self.etapas.append({
+                'etapa': nombre,
+                'segundos': segundos,
+                'memoria_pico_bytes': memoria_pico,
+                'payload_bytes': None,
+            })
+
+    def payload(self, nombre, contenido):
+        """Registra el tamaño serializado de una figura de Plotly o de un HTML."""
+        if not self.activo:
+            return
+        if hasattr(contenido, 'to_json'):
+            contenido = contenido.to_json()
+        tamano = len(contenido.encode('utf-8'))
+        for registro in reversed(self.etapas):
+            if registro['etapa'] == nombre:
+                registro['payload_bytes'] = tamano
+                return
+        self.etapas.append({
+            'etapa': nombre, 'segundos': None, 'memoria_pico_bytes': None, 'payload_bytes': tamano
+        })
+
+    def resumen(self):
+        filas = []
+        for registro in self.etapas:
+            p50, p95 = self.historial.percentiles(registro['etapa'])
+            filas.append({**registro, 'p50_segundos': p50, 'p95_segundos': p95})
+        return filas
+
+    def finalizar(self):
+        """Emite una línea de log estructurada por etapa y muestra el panel de depuración."""
+        if not self.activo:
+            return
+        filas = self.resumen()
+        for fila in filas:
+            logger.info(json.dumps({'perfil': fila}, default=float))
+        with st.expander("🛠️ Perfilado de la ejecución", expanded=False):
+            tabla = pd.DataFrame(filas)
+            for columna in ['segundos', 'p50_segundos', 'p95_segundos']:
+                tabla[columna] = tabla[columna] * 1000
+            tabla = tabla.rename(columns={
+                'segundos': 'ms', 'p50_segundos': 'p50 ms', 'p95_segundos': 'p95 ms',
+                'memoria_pico_bytes': 'memoria pico (bytes)', 'payload_bytes': 'payload (bytes)'
+            })
+            st.dataframe(tabla, use_container_width=True, hide_index=True)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+
+from cubo import MEDIDAS, construir_cubo
+from datos import RUTA_DATOS, leer_csv
+from filtros import COLUMNAS_FILTRO, IndiceFiltros
+from incremental import MAX_ACTUALIZACIONES, AgregadosIncrementales
+
+
+def _comprobar(agregados, df, selecciones):
+    """Compara los totales incrementales con los calculados directamente sobre las filas filtradas."""
+    mascara = np.ones(len(df), dtype=bool)
+    for columna, valores in selecciones.items():
+        mascara &= df[columna].isin(valores).to_numpy()
+    assert agregados.total_viajes() == mascara.sum()
+
+    codigos = {}
+    for dimension, etiquetas in agregados.etiquetas.items():
+        codigos[dimension] = pd.Categorical(df[dimension], categories=etiquetas).codes[mascara]
+        totales = agregados.totales[dimension]
+        np.testing.assert_allclose(totales['viajes'], np.bincount(codigos[dimension], minlength=len(etiquetas)))
+        for medida in MEDIDAS:
+            sumas = np.bincount(codigos[dimension], weights=df[medida].to_numpy()[mascara], minlength=len(etiquetas))
+            np.testing.assert_allclose(totales[f'suma_{medida}'], sumas, atol=1e-6)
+
+    for (a, b), cruzados in agregados.cruzados.items():
+        combinados = codigos[a] * len(agregados.etiquetas[b]) + codigos[b]
+        np.testing.assert_allclose(cruzados, np.bincount(combinados, minlength=cruzados.size))
+    return mascara
+
+
+def test_actualizaciones_coinciden_con_el_filtrado_directo():
+    df = leer_csv(RUTA_DATOS)
+    indice = IndiceFiltros(construir_cubo(df))
+    valores = {columna: list(indice.posiciones[columna]) for columna in COLUMNAS_FILTRO}
+    selecciones = {columna: list(todos) for columna, todos in valores.items()}
+    agregados = AgregadosIncrementales(indice, selecciones)
+    mascara = _comprobar(agregados, df, selecciones)
+
+    rng = np.random.default_rng(0)
+    # Más cambios que MAX_ACTUALIZACIONES para cubrir también el recálculo completo
+    for _ in range(max(300, 3 * MAX_ACTUALIZACIONES)):
+        columna = COLUMNAS_FILTRO[rng.integers(len(COLUMNAS_FILTRO))]
+        valor = valores[columna][rng.integers(len(valores[columna]))]
+        if valor in selecciones[columna]:
+            selecciones[columna] = [v for v in selecciones[columna] if v != valor]
+        else:
+            selecciones[columna] = selecciones[columna] + [valor]
+        agregados.actualizar(selecciones)
+        mascara = _comprobar(agregados, df, selecciones)
+
+    # Las series públicas salen de los mismos totales
+    filas = df[mascara]
+    esperado = filas.groupby('ciudad', observed=True).size()
+    assert agregados.conteo_por('ciudad').to_dict() == esperado[esperado > 0].to_dict()
+    medias = filas.groupby('pais', observed=True)['valoracion'].mean()
+    obtenido = agregados.media_por('pais', 'valoracion')
+    np.testing.assert_allclose(obtenido[list(medias.index)].to_numpy(), medias.to_numpy())
@@ -0,0 +1,68 @@
+import numpy as np
+import pandas as pd
+
+from analitica import AlmacenViajes
+from cubo import DIMENSIONES, construir_cubo
+from datos import RUTA_DATOS, leer_csv
+from filtros import IndiceFiltros
+from ingesta import IngestaStreaming, leer_por_bloques
+
+
+def _ordenar(cubo):
+    return cubo.sort_values(DIMENSIONES).reset_index(drop=True)
+
+
+def test_cubo_por_bloques_igual_al_cubo_completo():
+    ingesta = leer_por_bloques(RUTA_DATOS, tamano_bloque=700, tamano_muestra=100)
+    esperado = construir_cubo(leer_csv(RUTA_DATOS))
+    obtenido = ingesta.cubo.astype({dimension: esperado[dimension].dtype for dimension in DIMENSIONES})
+    pd.testing.assert_frame_equal(_ordenar(obtenido), _ordenar(esperado[obtenido.columns]), check_categorical=False)
+    assert ingesta.filas == int(esperado['viajes'].sum())
+
+
+def test_muestra_reservorio_uniforme():
+    # Cada fila debe entrar en la muestra con probabilidad k / n, esté en el bloque que esté
+    viajes = pd.read_csv(RUTA_DATOS, nrows=200)
+    viajes['id'] = np.arange(len(viajes))
+    k, repeticiones = 20, 400
+    apariciones = np.zeros(len(viajes))
+    for semilla in range(repeticiones):
+        ingesta = IngestaStreaming(tamano_muestra=k, semilla=semilla)
+        # Solo el muestreo de `procesar`, sin construir el cubo de cada bloque
+        for inicio in range(0, len(viajes), 30):
+            bloque = viajes.iloc[inicio:inicio + 30].reset_index(drop=True)
+            ingesta._actualizar_muestra(bloque)
+            ingesta.filas += len(bloque)
+        ids = ingesta._muestra['id'].to_numpy()
+        assert len(ids) == k and len(np.unique(ids)) == k
+        apariciones[ids] += 1
+
+    frecuencias = apariciones / repeticiones
+    esperada = k / len(viajes)
+    # Por bloques de 50 filas la media tiene un error típico de ~0.007
+    for tramo in np.split(frecuencias, 4):
+        assert abs(tramo.mean() - esperada) < 0.03
+    assert frecuencias.min() > 0
+
+
+def test_muestra_con_menos_filas_que_el_tamano():
+    viajes = pd.read_csv(RUTA_DATOS, nrows=15)
+    ingesta = IngestaStreaming(tamano_muestra=50)
+    ingesta.procesar(viajes.iloc[:10].copy())
+    ingesta.procesar(viajes.iloc[10:].copy())
+    assert len(ingesta.muestra) == 15
+
+
+def test_valores_poco_frecuentes_fuera_de_la_muestra(tmp_path):
+    # Tres viajes de un país que no entra en la muestra siguen en las opciones y en los totales
+    viajes = pd.read_csv(RUTA_DATOS)
+    raros = viajes.iloc[:3].assign(pais='Portugal', ciudad='Lisboa')
+    ruta = tmp_path / 'viajes.csv'
+    pd.concat([viajes, raros], ignore_index=True).to_csv(ruta, index=False)
+
+    ingesta = leer_por_bloques(str(ruta), tamano_bloque=1000, tamano_muestra=500)
+    assert 'Portugal' not in set(ingesta.muestra['pais'])
+    almacen = AlmacenViajes(IndiceFiltros(ingesta.muestra, columna_fecha='fecha'), IndiceFiltros(ingesta.cubo))
+    assert 'Portugal' in almacen.valores('pais')
+    assert almacen.filtrar().total_viajes() == len(viajes) + 3
+    assert almacen.filtrar({'pais': ['Portugal']}).total_viajes() == 3
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from topk import FrecuentesMisraGries, indices_top
+
+
+def test_indices_top_igual_que_orden_estable():
+    rng = np.random.default_rng(0)
+    for _ in range(200):
+        valores = rng.integers(0, 20, size=rng.integers(1, 60))
+        k = int(rng.integers(0, 70))
+        esperado = np.argsort(-valores, kind='stable')[:k]
+        np.testing.assert_array_equal(indices_top(valores, k), esperado)
+
+
+def test_misra_gries_cotas_por_bloques():
+    # Flujo con pocos valores frecuentes y una cola larga, resumido en bloques de tamaños distintos
+    rng = np.random.default_rng(1)
+    frecuentes = np.repeat([f'frecuente_{i}' for i in range(5)], [3000, 2000, 1500, 800, 400])
+    cola = np.array([f'raro_{i}' for i in rng.integers(0, 2000, size=6000)])
+    flujo = rng.permutation(np.concatenate([frecuentes, cola]))
+    reales = pd.Series(flujo).value_counts()
+
+    for capacidad in (10, 50, 200):
+        resumen = FrecuentesMisraGries(capacidad)
+        inicio = 0
+        while inicio < len(flujo):
+            tamano = int(rng.integers(1, 1500))
+            resumen.actualizar(flujo[inicio:inicio + tamano])
+            inicio += tamano
+
+        assert resumen.total == len(flujo)
+        assert len(resumen.conteos) <= capacidad
+        assert resumen.cota_error <= len(flujo) / (capacidad + 1)
+        # Cada estimación está en [real - cota, real]
+        reales_resumen = reales[resumen.conteos.index]
+        assert (resumen.conteos <= reales_resumen).all()
+        assert (reales_resumen - resumen.conteos <= resumen.cota_error).all()
+        # Todo valor con frecuencia mayor que la cota tiene contador
+        assert set(reales[reales > resumen.cota_error].index) <= set(resumen.conteos.index)
+
+        # Las posiciones garantizadas coinciden con el ranking real
+        garantizados = resumen.garantizados(5)
+        assert list(garantizados.index) == list(reales.index[:len(garantizados)])
+        top = resumen.top(5)
+        assert ((top['minimo'] <= reales[top.index]) & (reales[top.index] <= top['maximo'])).all()
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+# Contadores del resumen de ciudades más frecuentes en la ingesta por bloques (0 lo desactiva)
+CAPACIDAD_FRECUENTES = int(os.environ.get('TURISMO_CAPACIDAD_FRECUENTES', 0))
+
+
+def indices_top(valores, k):
+    """Posiciones de los `k` valores mayores, de mayor a menor, sin ordenar el array completo.
+
+    Con `argpartition` se separan los candidatos en O(n) y solo se ordenan esos
+    `k`. Los empates se resuelven por posición, como un orden estable.
+    """
+    valores = np.asarray(valores)
+    n = len(valores)
+    if k <= 0 or n == 0:
+        return np.empty(0, dtype=np.intp)
+    if k >= n:
+        candidatos = np.arange(n)
+    else:
+        umbral = valores[np.argpartition(valores, n - k)[n - k]]
+        mayores = np.flatnonzero(valores > umbral)
+        # Entre los empatados con el k-ésimo entran los de menor posición
+        iguales = np.flatnonzero(valores == umbral)[:k - len(mayores)]
+        candidatos = np.concatenate([mayores, iguales])
+    return candidatos[np.lexsort((candidatos, -valores[candidatos]))]
+
+
+def top_serie(valores, etiquetas, k, nombre=None):
+    """Serie con los `k` valores mayores y sus etiquetas, de mayor a menor."""
+    posiciones = indices_top(valores, k)
+    return pd.Series(np.asarray(valores)[posiciones], index=pd.Index(np.asarray(etiquetas)[posiciones], name=nombre))
+
+
+class FrecuentesMisraGries:
+    """Resumen de los valores más frecuentes de un flujo con memoria acotada (Misra-Gries).
+
+    Guarda como mucho `capacidad` contadores. Cada estimación es menor o igual
+    que la frecuencia real y la subestima como mucho en `cota_error`, que nunca
+    supera total / (capacidad + 1). Todo valor con frecuencia mayor que esa cota
+    tiene un contador. Los bloques se resumen por separado y se combinan, así
+    que cada bloque se procesa vectorizado.
+    """
+
+    def __init__(self, capacidad):
+        self.capacidad = capacidad
+        self.conteos = pd.Series(dtype=np.int64)
+        self.total = 0
+        self.cota_error = 0
+
+    def actualizar(self, valores):
+        conteos_bloque = pd.Series(valores).value_counts(sort=False)
+        conteos_bloque = conteos_bloque[conteos_bloque > 0]
+        self.total += int(conteos_bloque.sum())
+        conteos = pd.concat([self.conteos, conteos_bloque.astype(np.int64)]).groupby(level=0).sum()
+        if len(conteos) > self.capacidad:
+            # Restar a todos el contador (capacidad + 1)-ésimo y descartar los que quedan a cero
+            valores_conteo = conteos.to_numpy()
+            decremento = int(np.partition(valores_conteo, len(valores_conteo) - self.capacidad - 1)[
+                len(valores_conteo) - self.capacidad - 1
+            ])
+            conteos = conteos - decremento
+            conteos = conteos[conteos > 0]
+            self.cota_error += decremento
+        self.conteos = conteos
+        return self
+
+    def top(self, k):
+        """Los `k` valores con mayor estimación y el intervalo que contiene su frecuencia real."""
+        top = top_serie(self.conteos.to_numpy(), self.conteos.index, k)
+        return pd.DataFrame({
+            'minimo': top.to_numpy(),
+            'maximo': top.to_numpy() + self.cota_error,
+        }, index=top.index)
+
+    def garantizados(self, k):
+        """Valores del top `k` cuya posición es segura: su mínimo supera el máximo del siguiente."""
+        top = self.top(k + 1)
+        if len(top) <= k:
+            siguiente = self.cota_error  # cualquier valor sin contador tiene como mucho la cota
+        else:
+            siguiente = top['maximo'].iloc[k]
+        top = top.iloc[:k]
+        return top[top['minimo'] > siguiente]